@@ -0,0 +1,72 @@
+import os
+import sys
+from lexer import Lexer
+from parser_1 import Parser
+from interpreter import Interpreter
+from optimizer import Optimizer
+
+# Vectorized batch evaluation: input variables are bound to whole NumPy columns, so every
+# BiNode operation runs once, element-wise, over all rows, and each Print emits a column.
+# NumPy is only needed for this mode and is imported on first use.
+
+def require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        sys.exit("Batch mode requires NumPy (pip install numpy)")
+    return numpy
+
+def load_inputs(path):
+    # Read input columns from a .csv file with a header row, a .npy file holding a
+    # structured array, or a .npz archive of 1-D arrays; returns {name: column}
+    numpy = require_numpy()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npz":
+        with numpy.load(path) as archive:
+            return {name: numpy.asarray(archive[name], dtype=float) for name in archive.files}
+    if extension == ".npy":
+        table = numpy.load(path)
+    elif extension == ".csv":
+        table = numpy.genfromtxt(path, delimiter=",", names=True, dtype=float)
+    else:
+        sys.exit(f"Batch inputs must be a .csv, .npy or .npz file, got '{path}'")
+    table = numpy.atleast_1d(table)
+    if table.dtype.names is None:
+        sys.exit(f"'{path}' has no named columns")
+    return {name: numpy.asarray(table[name], dtype=float) for name in table.dtype.names}
+
+def run_batch(interpreter, columns):
+    # Execute a compiled program once over whole columns. The interpreter must have been
+    # created with inputs=columns.keys(). Returns one array per executed Print statement.
+    numpy = require_numpy()
+    columns = {name: numpy.asarray(values, dtype=float) for name, values in columns.items()}
+    rows = len(next(iter(columns.values()))) if columns else 1
+    for name, column in columns.items():
+        if len(column) != rows:
+            sys.exit(f"Batch input '{name}' has {len(column)} rows, expected {rows}")
+        interpreter.storage[name] = column
+
+    outputs = []
+    # Constant results are broadcast so every output column has one value per row
+    interpreter.write = lambda value: outputs.append(numpy.broadcast_to(numpy.asarray(value, dtype=float), (rows,)))
+    interpreter.execute()
+    return outputs
+
+def evaluate_batch(source, columns, mode="vm", opt_level=0):
+    # Convenience API: compile source with the column names as inputs and run it in batch mode
+    asts = Parser(Lexer(source).getTokenStream()).runParse()
+    if opt_level:
+        asts = Optimizer(opt_level).optimize(asts)
+    interpreter = Interpreter(asts, mode=mode, source=source, inputs=list(columns))
+    return run_batch(interpreter, columns)
+
+def write_outputs(outputs, file=None):
+    # Write the output columns as CSV, one column per executed Print statement; file
+    # defaults to the current sys.stdout, so redirecting stdout captures the output
+    if file is None:
+        file = sys.stdout
+    numpy = require_numpy()
+    if not outputs:
+        return
+    header = ",".join(f"print_{index}" for index in range(1, len(outputs) + 1))
+    numpy.savetxt(file, numpy.column_stack(outputs), delimiter=",", header=header, comments="", fmt="%.17g")
@@ -0,0 +1,82 @@
+# Measure compiler.py startup with python -X importtime and check that a plain run does
+# not import the debugger, lint or profiling stacks.
+#
+#   python benchmarks/bench_startup.py [--repeat R] [--top N] [--budget MS]
+#
+# Exits with status 1 if a plain run imports a deferred module, or if importing compiler
+# takes longer than --budget milliseconds.
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the options that need them may import (--debug, --lint, --memprofile,
+# --profile, --batch); none of them belongs on the path of a plain run
+DEFERRED = [
+    "debugger", "logging", "subprocess", "multiprocessing", "concurrent.futures",
+    "black", "flake8", "pylint", "memprofile", "profiler", "batch", "numpy",
+]
+
+PLAIN_RUN = "a = 1\nb = a * 2 + 3\nprint(b)\n"
+
+def import_times(args):
+    # Run python -X importtime with the given arguments from the repository root and return
+    # {module: (self us, cumulative us)}, keeping the first import of each module
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                            capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # The header line
+        times.setdefault(fields[2].strip(), (own, cumulative))
+    return times
+
+def best_import(repeat):
+    # Fastest of repeat imports of compiler, after one run that writes the bytecode caches
+    import_times(["-c", "import compiler"])
+    best = None
+    for _ in range(repeat):
+        times = import_times(["-c", "import compiler"])
+        if best is None or times["compiler"][1] < best["compiler"][1]:
+            best = times
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compiler.py startup time.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget", type=float, default=None, metavar="MS",
+                        help="fail if importing compiler takes longer than this")
+    args = parser.parse_args()
+
+    times = best_import(args.repeat)
+    total = times["compiler"][1] / 1000
+    print(f"import compiler: {total:8.1f} ms (best of {args.repeat})")
+    print(f"{'module':<32} {'self (ms)':>10} {'cumulative (ms)':>16}")
+    slowest = sorted(times.items(), key=lambda item: -item[1][1])[:args.top]
+    for module, (own, cumulative) in slowest:
+        print(f"{module:<32} {own / 1000:10.2f} {cumulative / 1000:16.2f}")
+
+    failed = False
+    run = import_times(["compiler.py", PLAIN_RUN, "--no-cache"])
+    loaded = [module for module in DEFERRED if module in run]
+    if loaded:
+        print(f"plain run imports deferred modules: {', '.join(loaded)}")
+        failed = True
+    else:
+        print("plain run imports none of the deferred modules")
+    if args.budget is not None and total > args.budget:
+        print(f"import compiler exceeds the {args.budget:.1f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# Compare the tree-walking reference interpreter with the bytecode VM.
+#
+#   python benchmarks/bench_vm.py [--statements N] [--repeat R]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parser_1 import Parser
+from interpreter import Interpreter
+from bytecode import compile_program
+from workloads import straight_line
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(interpreter):
+    output = io.StringIO()
+    interpreter.reset()
+    with contextlib.redirect_stdout(output):
+        interpreter.execute()
+    return output.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the tree walker with the bytecode VM.")
+    parser.add_argument("--statements", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = straight_line(args.statements)
+    asts = Parser(Lexer(source).getTokenStream()).runParse()
+    tree = Interpreter(asts, mode="tree")
+    vm = Interpreter(asts, mode="vm")
+
+    compile_time = best_of(1, lambda: setattr(vm, "code", compile_program(asts, vm.names)))
+    if run(tree) != run(vm):
+        sys.exit("tree and vm modes produced different output")
+
+    # The compiled code is kept on the interpreter, so each VM run measures execution only
+    tree_time = best_of(args.repeat, lambda: run(tree))
+    vm_time = best_of(args.repeat, lambda: run(vm))
+    print(f"statements: {len(asts)}, instructions: {len(vm.code.instructions)}")
+    print(f"compile: {compile_time * 1000:8.1f} ms")
+    print(f"tree:    {tree_time * 1000:8.1f} ms")
+    print(f"vm:      {vm_time * 1000:8.1f} ms")
+    print(f"speedup: {tree_time / vm_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
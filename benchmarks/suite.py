@@ -0,0 +1,167 @@
+# Reproducible benchmark suite: times each compiler phase on seeded, scaled workloads,
+# records peak memory per phase, and compares the results against a stored baseline.
+#
+#   python benchmarks/suite.py --output results.json
+#   python benchmarks/suite.py --save-baseline             # record benchmarks/baseline.json
+#   python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 0.15
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parser_1 import Parser
+from optimizer import Optimizer
+from interpreter import Interpreter
+from workloads import WORKLOADS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Phases in pipeline order
+PHASES = ["lex", "lex_stream", "parse", "optimize", "compile", "execute"]
+
+def run_pipeline(source, measure):
+    # Run every phase once through measure(func) -> (metric, value); returns {phase: metric}
+    metrics = {}
+
+    def phase(name, func):
+        metrics[name], value = measure(func)
+        return value
+
+    phase("lex", lambda: Lexer(source).getTokens())
+    tokens = phase("lex_stream", lambda: Lexer(source).getTokenStream())
+    asts = phase("parse", lambda: Parser(tokens).runParse())
+    # The optimizer rewrites trees in place, so it gets its own copy of the program and the
+    # interpreter phases measure the unoptimized program
+    to_optimize = Parser(Lexer(source).getTokenStream()).runParse()
+    phase("optimize", lambda: Optimizer(2).optimize(to_optimize))
+    interpreter = phase("compile", lambda: compiled(asts))
+    phase("execute", lambda: execute(interpreter))
+    return metrics
+
+def compiled(asts):
+    # Resolve slots and generate bytecode
+    interpreter = Interpreter(asts)
+    interpreter.compile()
+    return interpreter
+
+def execute(interpreter):
+    interpreter.write = lambda value: None  # Keep output formatting out of the measurement
+    interpreter.execute()
+    return interpreter
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return time.perf_counter() - start, value
+
+def traced(func):
+    # Peak traced memory allocated while func runs
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    value = func()
+    return tracemalloc.get_traced_memory()[1] - before, value
+
+def benchmark(source, repeat):
+    # Best-of-repeat time per phase, then one traced run for peak memory per phase
+    times = {}
+    for _ in range(repeat):
+        for name, elapsed in run_pipeline(source, timed).items():
+            times[name] = min(elapsed, times.get(name, elapsed))
+    tracemalloc.start()
+    try:
+        memory = run_pipeline(source, traced)
+    finally:
+        tracemalloc.stop()
+    return {name: {"time": times[name], "peak_memory": memory[name]} for name in PHASES}
+
+def run_suite(names, scale, repeat):
+    results = {}
+    for name in names:
+        source = WORKLOADS[name](scale)
+        results[name] = benchmark(source, repeat)
+        results[name]["_size"] = {"bytes": len(source), "lines": source.count("\n")}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, threshold, memory_threshold):
+    # Return a list of regression messages; phases or workloads missing on either side are skipped
+    regressions = []
+    for workload, phases in current["results"].items():
+        base_phases = baseline["results"].get(workload)
+        if base_phases is None:
+            continue
+        for phase, metrics in phases.items():
+            base = base_phases.get(phase)
+            if phase.startswith("_") or base is None:
+                continue
+            for metric, limit in (("time", threshold), ("peak_memory", memory_threshold)):
+                if limit is None or not base[metric]:
+                    continue
+                ratio = metrics[metric] / base[metric]
+                if ratio > 1 + limit:
+                    regressions.append(f"{workload}/{phase} {metric}: {base[metric]:.6g} -> "
+                                       f"{metrics[metric]:.6g} ({(ratio - 1) * 100:+.1f}%)")
+    return regressions
+
+def print_table(results):
+    print(f"{'workload':<18} {'phase':<11} {'time (ms)':>10} {'peak (KiB)':>11}")
+    for workload, phases in results["results"].items():
+        for phase, metrics in phases.items():
+            if phase.startswith("_"):
+                continue
+            print(f"{workload:<18} {phase:<11} {metrics['time'] * 1000:10.2f} {metrics['peak_memory'] / 1024:11.1f}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the lexer, parser, optimizer and interpreter.")
+    arg_parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                            help="workload to run (repeatable; default: all)")
+    arg_parser.add_argument("--scale", type=int, default=1, help="workload size multiplier")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="timing runs per workload (best is kept)")
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    arg_parser.add_argument("--baseline", help="compare against this results file")
+    arg_parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                            help="also store the results as the baseline (default: %(const)s)")
+    arg_parser.add_argument("--threshold", type=float, default=0.10,
+                            help="allowed relative slowdown per phase before failing (default: 0.10)")
+    arg_parser.add_argument("--memory-threshold", type=float, default=0.10,
+                            help="allowed relative peak-memory growth per phase (default: 0.10)")
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.workload or list(WORKLOADS), args.scale, args.repeat)
+    print_table(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["meta"]["scale"] != results["meta"]["scale"]:
+            sys.exit(f"Baseline was recorded at scale {baseline['meta']['scale']}, not {args.scale}")
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
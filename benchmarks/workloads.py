@@ -0,0 +1,63 @@
+# Seeded generators for scaled benchmark workloads. Every generator is deterministic for a
+# given size and seed, so results are comparable across runs and machines.
+
+import random
+
+def straight_line(statements, variables=16, seed=0):
+    # Long straight-line program that keeps reusing a small set of variables
+    rng = random.Random(seed)
+    names = [f"v{i}" for i in range(variables)]
+    lines = [f"{name} = {rng.randint(1, 9)}" for name in names]
+    operators = ["+", "-", "*"]
+    for index in range(statements):
+        a, b, c = rng.choice(names), rng.choice(names), rng.choice(names)
+        op1, op2 = rng.choice(operators), rng.choice(operators)
+        target = names[index % variables]
+        # Dividing by a sum of squares keeps values bounded and finite
+        lines.append(f"{target} = ({a} {op1} {b} {op2} {c}) / ({a} * {a} + {b} * {b} + 1)")
+        if index % 1000 == 0:
+            lines.append(f"print({target})")
+    return "\n".join(lines) + "\n"
+
+def nested_parens(depth, statements=10, seed=0):
+    # Statements whose expressions are nested `depth` parentheses deep
+    rng = random.Random(seed)
+    lines = ["x = 1"]
+    for _ in range(statements):
+        expression = "x"
+        for _ in range(depth):
+            expression = f"({expression} {rng.choice('+-')} {rng.randint(1, 9)})"
+        lines.append(f"x = {expression} / {depth * 10}")
+    lines.append("print(x)")
+    return "\n".join(lines) + "\n"
+
+def wide_chain(width, statements=10, operator="+", seed=0):
+    # Statements that chain `width` operands with one operator: a + b + 1.0001 + ...
+    rng = random.Random(seed)
+    # Operands close to 1 keep long products finite
+    lines = ["a = 1", "b = 1.0001"]
+    for index in range(statements):
+        operands = [rng.choice(("a", "b", "1.0001")) for _ in range(width)]
+        lines.append(f"c{index % 4} = {f' {operator} '.join(operands)}")
+    lines.append("print(c0)")
+    return "\n".join(lines) + "\n"
+
+def identifier_heavy(statements, variables=1000, seed=0):
+    # Many distinct, long identifiers: stresses identifier lexing, interning and slot resolution
+    rng = random.Random(seed)
+    names = [f"some_long_variable_name_{i}" for i in range(variables)]
+    lines = [f"{name} = {i % 7 + 1}" for i, name in enumerate(names)]
+    for index in range(statements):
+        a, b, c = rng.choice(names), rng.choice(names), rng.choice(names)
+        lines.append(f"{names[index % variables]} = {a} + {b} - {c}")
+    lines.append(f"print({names[0]})")
+    return "\n".join(lines) + "\n"
+
+# Named workloads run by suite.py, with their sizes at scale 1
+WORKLOADS = {
+    "straight_line": lambda scale: straight_line(5000 * scale),
+    "nested_parens": lambda scale: nested_parens(100, statements=50 * scale),
+    "wide_plus_chain": lambda scale: wide_chain(500, statements=20 * scale, operator="+"),
+    "wide_mult_chain": lambda scale: wide_chain(500, statements=20 * scale, operator="*"),
+    "identifier_heavy": lambda scale: identifier_heavy(5000 * scale),
+}
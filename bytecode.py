@@ -0,0 +1,123 @@
+from parser_1 import Node, BiNode, UnaryNode, Assign, Print, postorder
+
+# Opcodes of the stack VM. Every instruction is an (opcode, argument) tuple in
+# Code.instructions; instructions without an argument carry 0.
+LOAD_CONST = 0
+LOAD_SLOT = 1
+STORE_SLOT = 2
+BINARY_ADD = 3
+BINARY_SUB = 4
+BINARY_MUL = 5
+BINARY_DIV = 6
+BINARY_POW = 7
+PRINT = 8
+MARK = 9  # Start of statement arg; only emitted for the sampling profiler
+UNARY_NEG = 10
+
+OPNAMES = ("LOAD_CONST", "LOAD_SLOT", "STORE_SLOT", "BINARY_ADD", "BINARY_SUB",
+           "BINARY_MUL", "BINARY_DIV", "BINARY_POW", "PRINT", "MARK", "UNARY_NEG")
+
+# Operator token type -> binary opcode
+BINARY_OPS = {
+    "TT_PLUS": BINARY_ADD,
+    "TT_MINUS": BINARY_SUB,
+    "TT_MULT": BINARY_MUL,
+    "TT_DIV": BINARY_DIV,
+    "TT_POW": BINARY_POW,
+}
+
+class Code:
+    # A compiled program: flat instruction list plus constant and name tables.
+    # names is the Resolver's slot -> variable table
+
+    def __init__(self):
+        self.instructions = []
+        self.consts = []
+        self.names = []
+        # stmt_offsets[i] is the index of the first instruction of statement i; the last
+        # entry is len(instructions), so statement i spans stmt_offsets[i]:stmt_offsets[i + 1]
+        self.stmt_offsets = [0]
+        self.marked = False  # True if every statement starts with a MARK instruction
+
+    def __repr__(self):
+        return self.disassemble()
+
+    def disassemble(self):
+        # Render the instructions one per line, grouped by statement
+        lines = []
+        for index in range(len(self.stmt_offsets) - 1):
+            lines.append(f"; statement {index}")
+            for pc in range(self.stmt_offsets[index], self.stmt_offsets[index + 1]):
+                op, arg = self.instructions[pc]
+                if op == LOAD_CONST:
+                    lines.append(f"{pc:6d} {OPNAMES[op]:<12} {self.consts[arg]!r}")
+                elif op in (LOAD_SLOT, STORE_SLOT):
+                    lines.append(f"{pc:6d} {OPNAMES[op]:<12} {self.names[arg]}")
+                elif op == MARK:
+                    lines.append(f"{pc:6d} {OPNAMES[op]:<12} {arg}")
+                else:
+                    lines.append(f"{pc:6d} {OPNAMES[op]}")
+        return "\n".join(lines)
+
+class CodeGen:
+    # Lowers resolved Assign/Print/BiNode/UnaryNode/Node trees (see resolver.py) to a Code object.
+    # With marked=True each statement begins with MARK <statement index>, which lets the
+    # sampling profiler see which statement the VM is in (see profiler.py)
+
+    def __init__(self, marked=False):
+        self.code = Code()
+        self.code.marked = marked
+        self.const_index = {}
+
+    def compile(self, asts, names):
+        self.code.names = names
+        for index, ast in enumerate(asts):
+            if self.code.marked:
+                self.emit(MARK, index)
+            self.statement(ast)
+            self.code.stmt_offsets.append(len(self.code.instructions))
+        return self.code
+
+    def emit(self, op, arg=0):
+        self.code.instructions.append((op, arg))
+
+    def const(self, value):
+        # Index of value in the constant table, reusing an existing entry; zeros and
+        # None are keyed by repr so that 0.0 and -0.0 stay distinct
+        key = value if value else repr(value)
+        index = self.const_index.get(key)
+        if index is None:
+            index = self.const_index[key] = len(self.code.consts)
+            self.code.consts.append(value)
+        return index
+
+    def statement(self, ast):
+        if isinstance(ast, Assign):
+            self.expression(ast.value)
+            self.emit(STORE_SLOT, ast.slot)
+        elif isinstance(ast, Print):
+            self.expression(ast.value)
+            self.emit(PRINT)
+        else:
+            raise TypeError(f"Cannot compile statement {ast!r}")
+
+    def expression(self, node):
+        # Post-order walk: operands are pushed before the operator that consumes them
+        emit = self.code.instructions.append
+        for node in postorder(node):
+            if isinstance(node, BiNode):
+                emit((BINARY_OPS[node.op_tok.type], 0))
+            elif isinstance(node, UnaryNode):
+                emit((UNARY_NEG, 0))
+            elif isinstance(node, Node):
+                tok = node.tok
+                if tok.type == "TT_IDENT":
+                    emit((LOAD_SLOT, tok.slot))
+                else:
+                    emit((LOAD_CONST, self.const(tok.read(None))))
+            else:
+                raise TypeError(f"Cannot compile expression {node!r}")
+
+def compile_program(asts, names, marked=False):
+    # Convenience wrapper: lower a list of resolved statement trees to bytecode
+    return CodeGen(marked).compile(asts, names)
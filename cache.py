@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+import sys
+
+# Bump whenever the token, AST or bytecode format changes so stale entries are ignored
+COMPILER_VERSION = "5"
+
+# Default location, next to the compiler sources in the spirit of __pycache__
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pccache__")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Suffix of finished cache entries; temporary files being written use ".tmp"
+ENTRY_SUFFIX = ".pcc"
+
+class CompileCache:
+    # Persistent on-disk cache of compiled programs keyed by a hash of the source text,
+    # the compiler version and the compile options. Entries are written to a temporary
+    # file and atomically renamed into place, so concurrent writers never expose a partial
+    # entry. A hit refreshes the entry's mtime; once the directory grows beyond max_bytes
+    # the least recently used entries are evicted.
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source, options=""):
+        digest = hashlib.sha256()
+        digest.update(COMPILER_VERSION.encode())
+        digest.update(b"\0")
+        # Entries hold pickled ASTs and, for the python backend, marshalled code objects,
+        # which only the interpreter version that wrote them can read back
+        digest.update(sys.implementation.cache_tag.encode())
+        digest.update(b"\0")
+        digest.update(options.encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def load(self, key):
+        # Return the cached value for key, or None on a miss or an unreadable entry
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupt or incompatible entry: drop it and recompile
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return value
+
+    def store(self, key, value):
+        # Write value for key; returns False if the value could not be serialized
+        import tempfile  # Only needed on a miss; keeps it off the startup path of a cache hit
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path(key))
+        except (pickle.PicklingError, RecursionError, TypeError, OSError):
+            self._remove(temp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        # Remove least recently used entries until the cache fits in max_bytes
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Evicted by a concurrent process
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,52 +1,345 @@
 from lexer import *
 from parser_1 import *
 from interpreter import *
-from debugger import Debugger
-from validator import parse_code  # Import the parse_code function
+from optimizer import Optimizer
+from cache import CompileCache, DEFAULT_CACHE_DIR
+from instrument import Stats, NO_STATS
+from journal import Journal, DEFAULT_CAPACITY
+import argparse
+import contextlib
+import marshal
 import sys
+import time
 
-def main():
-    # Get the source code file path from command line arguments
-    source = sys.argv[1]
+# Only what a plain run needs is imported above. The validator is imported on a cache miss,
+# and the debugger (logging, subprocess), the lint stack, the profilers and batch mode
+# when their options are given; benchmarks/bench_startup.py checks that this stays so.
 
-    # Validate the source code
-    if not parse_code(source):
-        print("Validation failed. Exiting.")
+def parse_breakpoint(spec):
+    # argparse type of -b, deferring the debugger import until a breakpoint is given
+    from debugger import parse_breakpoint
+    return parse_breakpoint(spec)
+
+def parse_args(argv=None):
+    # Command line: the program source plus compiler options
+    arg_parser = argparse.ArgumentParser(description="Compile and run a program.")
+    arg_parser.add_argument("source", nargs="?", help="program source code")
+    arg_parser.add_argument("-f", "--file", metavar="PATH",
+                            help="read the program from PATH instead; with --stream it is lexed "
+                                 "through mmap in chunks, so memory stays flat on very large files")
+    arg_parser.add_argument("-O", dest="opt_level", type=int, nargs="?", const=1, default=0,
+                            choices=[0, 1, 2],
+                            help="optimization level: 1 folds constants and simplifies identities, "
+                                 "2 also removes dead stores (-O alone means -O1)")
+    arg_parser.add_argument("--opt-report", action="store_true",
+                            help="print what the optimizer changed to stderr")
+    arg_parser.add_argument("--backend", choices=["vm", "tree", "python"], default="vm",
+                            help="execution backend: bytecode VM (default), reference tree walker, "
+                                 "or transpilation to a Python code object")
+    arg_parser.add_argument("--lint", action="store_true",
+                            help="also run the full lint tier (black, flake8, pylint) in the background "
+                                 "and report it after the program finishes")
+    arg_parser.add_argument("--batch", metavar="FILE",
+                            help="run the program once over all rows of a .csv/.npy/.npz file whose "
+                                 "columns bind input variables; printed values are written as CSV columns")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="pipelined mode: lex, parse and execute one statement at a time with "
+                                 "constant memory (skips validation, the cache and -O2 dead-store removal)")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always recompile instead of using the compilation cache")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                            help="directory of the compilation cache (default: %(default)s)")
+    arg_parser.add_argument("--debug", action="store_true",
+                            help="run under the debugger: a command prompt before the program starts, "
+                                 "at every breakpoint and after it finishes")
+    arg_parser.add_argument("-b", "--break", dest="breakpoints", type=parse_breakpoint, action="append",
+                            default=[], metavar="LINE[ if COND]",
+                            help="debug with a breakpoint at LINE, optionally only when the Python "
+                                 "expression COND over the program variables is true (repeatable)")
+    arg_parser.add_argument("-w", "--watch", dest="watchpoints", action="append", default=[],
+                            metavar="NAME", help="debug, pausing whenever an assignment changes NAME (repeatable)")
+    arg_parser.add_argument("--record", action="store_true",
+                            help="debug in record mode, journaling every assignment so that the "
+                                 "debugger can step backwards (reverse-step, reverse-continue, goto)")
+    arg_parser.add_argument("--record-capacity", type=int, default=DEFAULT_CAPACITY, metavar="N",
+                            help="assignments kept in the record-mode journal (default: %(default)s)")
+    arg_parser.add_argument("--trace-memory", action="store_true",
+                            help="debug with allocations traced from the start, so the first 'memory' "
+                                 "command shows what the program allocated (slows execution down)")
+    arg_parser.add_argument("--stats", action="store_true",
+                            help="print time and allocations per compiler phase, and counts and time "
+                                 "per AST node type and source line, to stderr")
+    arg_parser.add_argument("--memprofile", action="store_true",
+                            help="trace allocations: memory kept by the tokens, AST, storage and code, "
+                                 "and allocation and storage growth per source line, reported to stderr")
+    arg_parser.add_argument("--trace", metavar="FILE",
+                            help="write the same measurements as a JSON trace (Chrome trace-event format)")
+    arg_parser.add_argument("--profile", metavar="FILE",
+                            help="sample the running program and write its guest stacks to FILE in "
+                                 "collapsed-stack format for flamegraph tools; a per-line summary "
+                                 "goes to stderr")
+    arg_parser.add_argument("--profile-interval", type=float, default=10.0, metavar="MS",
+                            help="sampling interval of --profile in milliseconds (default: %(default)s)")
+    args = arg_parser.parse_args(argv)
+    if (args.source is None) == (args.file is None):
+        arg_parser.error("give either the program source or --file PATH")
+    return args
+
+def compile_source(source, args, cache=None, inputs=(), stats=NO_STATS, program=None, statements=None):
+    # Validate, lex, parse, optimize and resolve the source into an Interpreter that is
+    # ready to execute; returns None if validation fails. inputs names variables that are
+    # set before the program runs (batch mode). With a cache, a program compiled by an
+    # earlier run is loaded instead and all of those phases are skipped. Each phase is
+    # recorded in stats (an instrument.Stats); the default NO_STATS records nothing.
+    # program names the program for the validator's "error resolved" messages.
+    # statements are the source's ASTs if they are already parsed (the IDE's incremental
+    # Document), which skips lexing and parsing.
+    key = None
+    if cache is not None:
+        with stats.phase("cache"):
+            key = cache.key(source, f"O{args.opt_level}:{args.backend}:{','.join(inputs)}")
+            entry = cache.load(key)
+        interpreter = None if entry is None else interpreter_from_entry(entry, args.backend, source)
+        if interpreter is not None:
+            if args.opt_report and entry["report"]:
+                print(entry["report"], file=sys.stderr)
+            return interpreter
+
+    # Validate the source code (fast syntax-only tier on the run path). In batch mode
+    # stdout carries the CSV output, so the validator's messages go to stderr
+    messages = contextlib.redirect_stdout(sys.stderr) if args.batch else contextlib.nullcontext()
+    with stats.phase("validate"), messages:
+        from validator import parse_code, default_validator
+        valid = parse_code(source, validator=default_validator(cache_dir(args)), program=program)
+        if not valid:
+            print("Validation failed. Exiting.")
+    if not valid:
+        return None
+
+    if statements is not None:
+        asts = list(statements)
+    else:
+        # Create a new lexer instance with the provided source code
+        new_lexer = Lexer(source)
+
+        # Get a compact token stream from the lexer
+        with stats.phase("lex"):
+            tokens = new_lexer.getTokenStream()
+
+        # Uncomment the following lines to print tokens
+        # for i in tokens:
+        #     print(i)
+
+        # Create a new parser instance that reads the token stream by index
+        new_parser = Parser(tokens)
+
+        # Generate Abstract Syntax Trees (ASTs) using the parser
+        with stats.phase("parse"):
+            asts = new_parser.runParse()
+
+    # Optimize the ASTs before handing them to the interpreter
+    report = None
+    if args.opt_level:
+        optimizer = Optimizer(args.opt_level)
+        with stats.phase("optimize"):
+            asts = optimizer.optimize(asts)
+        report = optimizer.format_report()
+        if args.opt_report:
+            print(report, file=sys.stderr)
+
+    # Create a new interpreter instance with the generated ASTs; variables are resolved
+    # to storage slots here, so undefined names are reported before anything runs
+    with stats.phase("resolve"):
+        new_interpreter = Interpreter(asts, mode=args.backend, source=source, inputs=inputs)
+    with stats.phase("compile"):
+        new_interpreter.compile()
+
+    if cache is not None:
+        with stats.phase("cache store"):
+            cache.store(key, cache_entry(new_interpreter, report))
+    return new_interpreter
+
+def cache_entry(interpreter, report):
+    # Picklable snapshot of a compiled program; Python code objects are stored marshalled
+    code = interpreter.code
+    if interpreter.mode == "python":
+        code = marshal.dumps(code)
+    return {"asts": interpreter.asts, "names": interpreter.names, "code": code, "report": report}
+
+def interpreter_from_entry(entry, mode, source):
+    # Rebuild an Interpreter from a cache entry without re-resolving or recompiling;
+    # returns None (a cache miss) if the marshalled code cannot be read back
+    interpreter = Interpreter(entry["asts"], mode=mode, source=source, names=entry["names"])
+    code = entry["code"]
+    if mode == "python":
+        try:
+            code = marshal.loads(code)
+        except (ValueError, EOFError, TypeError):
+            return None
+    interpreter.code = code
+    return interpreter
+
+def run_streaming(tokens, args):
+    # Connect the lexer, parser and interpreter as generators: each statement executes as
+    # soon as its newline is reached and is then discarded
+    statements = Parser(tokens).iter_statements()
+    if args.opt_level:
+        statements = Optimizer(args.opt_level).iter_optimize(statements)
+    new_interpreter = Interpreter([], mode=args.backend)
+    new_interpreter.execute_stream(statements)
+    return new_interpreter
+
+def run_profiled(interpreter, args):
+    # Execute under the sampling profiler and write its results
+    from profiler import Profiler
+    with Profiler(interpreter, args.profile_interval / 1000) as profiler:
+        interpreter.execute()
+    with open(args.profile, "w") as file:
+        profiler.write_collapsed(file)
+    print(profiler.summary(), file=sys.stderr)
+
+def report_stats(stats, args):
+    # Emit the collected measurements as requested by --stats and --trace
+    if not stats.enabled:
         return
+    if args.stats or args.memprofile:
+        print(stats.summary(), file=sys.stderr)
+    if args.trace:
+        stats.write_trace(args.trace)
+
+def split_options(argv):
+    # Split a tool's command line at "--" into its own arguments and the compiler.py
+    # options it passes on to every compilation (driver.py, daemon.py)
+    if "--" not in argv:
+        return list(argv), []
+    split = argv.index("--")
+    return argv[:split], argv[split + 1:]
+
+def cache_dir(args):
+    # Directory of the compilation cache and the validator's diagnostics store selected by
+    # the options, None with --no-cache
+    return None if args.no_cache else args.cache_dir
 
-    # Create a new lexer instance with the provided source code
-    new_lexer = Lexer(source)
+def open_cache(args):
+    # The compilation cache selected by the options, None with --no-cache
+    directory = cache_dir(args)
+    return None if directory is None else CompileCache(directory)
 
-    # Get tokens from the lexer
-    tokens = new_lexer.getTokens()
+def run_program(source, args, program=None, stats=NO_STATS, timings=None, prepare=None, statements=None):
+    # Compile the source through the cache and execute it: the run path shared by main,
+    # worker.py and driver.py. Returns the Interpreter, or None if validation failed.
+    # prepare(interpreter) is called between the two (main attaches the debugger there),
+    # timings, if given, gets the seconds spent in "compile" and "execute", and statements
+    # are passed on to compile_source. The execution is profiled with --profile; with
+    # stats, --stats and --trace time the real backend and then count nodes and lines in a
+    # separate instrumented run, while the memory profiler traces allocations as it runs
+    start = time.perf_counter()
+    interpreter = compile_source(source, args, open_cache(args), stats=stats, program=program,
+                                 statements=statements)
+    if timings is not None:
+        timings["compile"] = time.perf_counter() - start
+    if interpreter is None:
+        return None
+    if prepare is not None:
+        prepare(interpreter)
+    if stats.enabled:
+        interpreter.stats = stats
+    start = time.perf_counter()
+    with stats.phase("execute", allocations=bool(args.memprofile)):
+        if args.profile:
+            run_profiled(interpreter, args)
+        else:
+            interpreter.execute()
+    if timings is not None:
+        timings["execute"] = time.perf_counter() - start
+    if stats.enabled and not args.memprofile:
+        with stats.phase("instrumented run", allocations=False):
+            stats.instrumented_run(interpreter)
+    return interpreter
 
-    # Uncomment the following lines to print tokens
-    # for i in tokens:
-    #     print(i)
+def main(argv=None):
+    args = parse_args(argv)
 
-    # Create a new parser instance with the obtained tokens
-    new_parser = Parser(tokens)
+    # Streaming mode: first output appears before the rest of the program is parsed. A
+    # program file is lexed straight from its memory mapping and never read as a whole
+    if args.stream:
+        if args.file is not None:
+            run_streaming(FileLexer(args.file).iter_tokens(), args)
+        else:
+            run_streaming(Lexer(args.source).iter_tokens(), args)
+        return
+
+    # Get the source code from the command line or the program file; validation, the
+    # cache and the compiled pipeline all work on the whole text
+    source = args.source
+    if args.file is not None:
+        with open(args.file) as file:
+            source = file.read()
+
+    # Batch mode: evaluate the program element-wise over whole input columns, reusing an
+    # earlier compilation from the cache when possible
+    if args.batch:
+        import batch
+        columns = batch.load_inputs(args.batch)
+        new_interpreter = compile_source(source, args, open_cache(args), inputs=list(columns))
+        if new_interpreter is not None:
+            batch.write_outputs(batch.run_batch(new_interpreter, columns))
+        return
+
+    # Instrumentation is only set up when asked for; otherwise every phase below is a no-op
+    stats = NO_STATS
+    if args.memprofile:
+        from memprofile import MemoryProfiler
+        stats = MemoryProfiler()
+    elif args.stats or args.trace:
+        stats = Stats()
 
-    # Generate Abstract Syntax Trees (ASTs) using the parser
-    asts = new_parser.runParse()
+    validator = lint = debugger = None
 
-    # Create a new interpreter instance with the generated ASTs
-    new_interpreter = Interpreter(asts)
+    def prepare(new_interpreter):
+        # Runs once the program is compiled, before it starts
+        nonlocal validator, lint, debugger
 
-    # Create a new debugger instance
-    debugger = Debugger()
+        # Start the full lint tier in a process pool while the program runs
+        if args.lint:
+            from validator import default_validator
+            validator = default_validator(cache_dir(args))
+            lint = validator.submit(source, "full")
 
-    # Load the script into the debugger
-    script_lines = debugger.load_script(source)
+        # Only a debugging session attaches a debugger; without one the interpreter runs
+        # without any per-statement checks
+        if args.debug or args.breakpoints or args.watchpoints or args.record or args.trace_memory:
+            from debugger import Debugger
+            debugger = Debugger(args.trace_memory)
+            debugger.attach(new_interpreter)
+            if args.record:
+                new_interpreter.journal = Journal(args.record_capacity)
+            for line, condition in args.breakpoints:
+                debugger.add_breakpoint(line, condition)
+            for name in args.watchpoints:
+                try:
+                    debugger.add_watchpoint(name)
+                except KeyError as e:
+                    sys.exit(f"Error: {e.args[0]}")
+            if not args.breakpoints and not args.watchpoints:
+                # Let the user set breakpoints before the program starts
+                debugger.user_command_loop()
 
-    # Run the debugger script
-    debugger.run_debugger_script(script_lines)
+    # Compile the program and execute it to interpret and run it
+    new_interpreter = run_program(source, args, program=args.file, stats=stats, prepare=prepare)
+    report_stats(stats, args)
+    if new_interpreter is None:
+        return
 
-    # Execute the interpreter to interpret and run the program
-    new_interpreter.execute()
+    # Report the background lint results
+    if lint is not None:
+        from validator import report
+        report(validator.collect(lint))
+        validator.shutdown()
 
-    # Enter the user command loop of the debugger
-    debugger.user_command_loop()
+    # Enter the user command loop of the debugger to inspect the final state
+    if debugger is not None:
+        debugger.finish(new_interpreter)
 
 # Call the main function when the script is executed
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+# Compile-and-run service: a long-lived asyncio server that tools send programs to instead
+# of starting a cold compiler.py process for each one.
+#
+#   python daemon.py --socket /tmp/compiler.sock --jobs 4 -- -O2
+#   python daemon.py --port 7461
+#
+# Options after "--" are passed to every compilation as compiler.py options. Requests and
+# replies are JSON objects, each framed by a 4-byte big-endian length:
+#
+#   {"id": 1, "source": "a = 1\nprint(a)\n", "mode": "run", "timeout": 2, "memory": 64}
+#   {"id": 1, "status": "ok", "stdout": "1.0\n", "stderr": "", "timings": {...}}
+#
+# mode is tokenize, parse or run (the default); tokenize and parse replies carry a "result".
+# Requests run on a fixed pool of worker.py processes, which all use the same compile cache.
+# timeout (seconds) and memory (MiB the worker may grow by) are capped by the server's own
+# limits; a worker that runs out of time is killed and replaced.
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+DEFAULT_PORT = 7461
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+def encode_frame(message):
+    data = json.dumps(message).encode()
+    return HEADER.pack(len(data)) + data
+
+async def read_frame(reader):
+    # Next message from the stream, None at end of stream
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f"frame of {size} bytes exceeds the {MAX_FRAME} byte limit")
+    return json.loads(await reader.readexactly(size))
+
+class Worker:
+    # One worker.py process, handling one request at a time
+    def __init__(self, process):
+        self.process = process
+        self.ids = itertools.count(1)
+
+    @classmethod
+    async def start(cls, options):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER, *options,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            limit=MAX_FRAME)
+        await process.stdout.readline()  # {"ready": true} once the imports are done
+        return cls(process)
+
+    async def request(self, source, mode, memory):
+        # Send one request and collect its streamed output until the final message
+        request_id = next(self.ids)
+        message = {"id": request_id, "source": source, "mode": mode, "memory": memory}
+        self.process.stdin.write((json.dumps(message) + "\n").encode())
+        await self.process.stdin.drain()
+        output = {"stdout": [], "stderr": []}
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                return {"status": "worker exited", "stdout": "".join(output["stdout"]),
+                        "stderr": "".join(output["stderr"]), "timings": {}}
+            message = json.loads(line)
+            if message.get("id") != request_id:
+                continue
+            if "done" in message:
+                reply = {"status": message["done"], "stdout": "".join(output["stdout"]),
+                         "stderr": "".join(output["stderr"]), "timings": message["timings"]}
+                if "result" in message:
+                    reply["result"] = message["result"]
+                return reply
+            output[message["stream"]].append(message["text"])
+
+    def alive(self):
+        return self.process.returncode is None
+
+    async def stop(self):
+        if self.alive():
+            self.process.kill()
+        await self.process.wait()
+
+class Pool:
+    # A fixed number of workers; requests wait for an idle one, so at most size programs
+    # run at a time however many clients are connected
+    def __init__(self, size, options):
+        self.size = size
+        self.options = options
+        self.idle = asyncio.Queue()
+        self.workers = set()
+
+    async def start(self):
+        for worker in await asyncio.gather(*(Worker.start(self.options) for _ in range(self.size))):
+            self.workers.add(worker)
+            self.idle.put_nowait(worker)
+
+    async def replace(self, worker):
+        # Swap a killed or crashed worker for a fresh one
+        self.workers.discard(worker)
+        await worker.stop()
+        worker = await Worker.start(self.options)
+        self.workers.add(worker)
+        return worker
+
+    async def submit(self, source, mode, timeout, memory):
+        worker = await self.idle.get()
+        try:
+            try:
+                reply = await asyncio.wait_for(worker.request(source, mode, memory), timeout)
+            except asyncio.TimeoutError:
+                reply = {"status": "timeout", "stdout": "", "stderr": "", "timings": {}}
+            if reply["status"] in ("timeout", "worker exited") or not worker.alive():
+                worker = await self.replace(worker)
+        finally:
+            self.idle.put_nowait(worker)
+        return reply
+
+    async def stop(self):
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+class Server:
+
+    def __init__(self, pool, timeout, memory):
+        self.pool = pool
+        self.timeout = timeout  # Seconds a request may run at most
+        self.memory = memory  # Bytes a worker may grow by during a request at most
+
+    async def handle(self, request):
+        # Validate one request, run it on the pool and time it
+        received = time.perf_counter()
+        source = request.get("source")
+        mode = request.get("mode", "run")
+        if not isinstance(source, str):
+            return {"status": "error", "stderr": "Request needs a 'source' string\n"}
+        try:
+            timeout = min(float(request.get("timeout", self.timeout)), self.timeout)
+            memory = self.memory
+            if request.get("memory") is not None:
+                memory = min(int(float(request["memory"]) * 1024 * 1024), memory)
+        except (TypeError, ValueError):
+            return {"status": "error", "stderr": "Request limits must be numbers\n"}
+        reply = await self.pool.submit(source, mode, timeout, memory)
+        reply["timings"]["total"] = time.perf_counter() - received
+        return reply
+
+    async def serve_client(self, reader, writer):
+        # Requests on one connection are answered in order; connections run concurrently
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    writer.write(encode_frame({"status": "error", "stderr": f"Bad request: {e}\n"}))
+                    break
+                if request is None:
+                    break
+                reply = await self.handle(request)
+                if "id" in request:
+                    reply["id"] = request["id"]
+                writer.write(encode_frame(reply))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(args, compiler_options):
+    pool = Pool(args.jobs or os.cpu_count() or 1, compiler_options)
+    await pool.start()
+    server = Server(pool, args.timeout, int(args.memory * 1024 * 1024))
+    if args.socket:
+        listener = await asyncio.start_unix_server(server.serve_client, path=args.socket)
+        print(f"Listening on {args.socket} with {pool.size} workers", file=sys.stderr)
+    else:
+        listener = await asyncio.start_server(server.serve_client, args.host, args.port)
+        print(f"Listening on {args.host}:{args.port} with {pool.size} workers", file=sys.stderr)
+    try:
+        # SIGTERM shuts down like Ctrl+C: workers are stopped and the socket file removed
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await pool.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+def request(message, socket_path=None, host="127.0.0.1", port=DEFAULT_PORT):
+    # Blocking client for tools: send one request and return the reply
+    if socket_path:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socket_path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile("rb") as file:
+        connection.sendall(encode_frame(message))
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ConnectionError("connection closed by the server")
+        (size,) = HEADER.unpack(header)
+        return json.loads(file.read(size))
+
+def main(argv=None):
+    from compiler import split_options
+    argv, compiler_options = split_options(sys.argv[1:] if argv is None else argv)
+
+    arg_parser = argparse.ArgumentParser(description="Serve compile-and-run requests over a local socket.")
+    arg_parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="TCP address (default: %(default)s)")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port (default: %(default)s)")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=None,
+                            help="number of worker processes (default: CPU count)")
+    arg_parser.add_argument("--timeout", type=float, default=10.0,
+                            help="longest a request may take, in seconds (default: %(default)s)")
+    arg_parser.add_argument("--memory", type=float, default=256.0,
+                            help="most a worker may grow by during a request, in MiB (default: %(default)s)")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args, compiler_options))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,73 +1,217 @@
+import bisect
 import sys
-import os
-import inspect
 import subprocess
 import logging
+import tracemalloc
+from parser_1 import Assign
+from interpreter import UNSET
+from memprofile import storage_size, take_snapshot, format_diff
 
 # Define a class representing a breakpoint
 class Breakpoint:
-    def __init__(self, line_number, condition=None):
+    # condition is an expression over the program variables, compiled once to a code object
+    # when the breakpoint is set. hits counts how often the line was reached with the
+    # condition true; the first ignore_count of those hits do not stop.
+    def __init__(self, line_number, condition=None, ignore_count=0):
         self.line_number = line_number
         self.condition = condition
+        self.code = compile(condition, f"<condition at line {line_number}>", "eval") if condition else None
+        self.ignore_count = ignore_count
+        self.hits = 0
+
+    def __repr__(self):
+        text = f"line {self.line_number}"
+        if self.condition:
+            text += f" if {self.condition}"
+        text += f" (hits: {self.hits}"
+        if self.ignore_count:
+            text += f", ignoring next {self.ignore_count}"
+        return text + ")"
+
+    # Decide whether reaching the breakpoint's line should pause execution
+    def triggered(self, variables):
+        """Evaluate the condition and the ignore count; True if execution should stop."""
+        if self.code is not None:
+            try:
+                if not eval(self.code, {}, variables):
+                    return False
+            except Exception as e:
+                print(f"Error in condition at line {self.line_number}: {e}")
+                return True
+        self.hits += 1
+        if self.ignore_count:
+            self.ignore_count -= 1
+            return False
+        return True
 
 # Define the main debugger class
 class Debugger:
 
     # Constructor to initialize debugger state
-    def __init__(self):
-        """Initialize the Debugger."""
-        self.breakpoints = set()
-        self.conditional_breakpoints = []
+    def __init__(self, trace_memory=False):
+        """Initialize the Debugger. With trace_memory, allocations are traced from the
+        moment the debugger attaches; otherwise from the first 'memory' command."""
+        self.breakpoints = {}  # line -> Breakpoint
         self.call_stack = []
         self.variables = {}
-        self.memory = {}
+        self.memory = {}  # Last memory snapshot and where it was taken (see _display_memory)
+        self.trace_memory = trace_memory
         self.watchpoints = set()
-        self.previous_values = {}
         self.command_history = []
 
+        # State of the attached program (see attach)
+        self.interpreter = None
+        self.script_lines = []
+        self.statement_lines = []  # Source line of each statement
+        self.statement_slots = []  # Slot each statement assigns, None for Print
+        self.line_starts = [0]  # Source offset of each line
+        self.pending_write = None  # (statement index, slot, old value) of a watched write
+        self.stops = None  # Sorted indices of statements with breakpoints, rebuilt on demand
+        self.stepping = False
+        self.current_line = None
+        self.current_index = None  # Index of the statement execution is paused before
+        self.resume = None  # Statement to continue from after moving through time
+
         # Initialize logging
         logging.basicConfig(filename='debugger.log', level=logging.DEBUG)
 
-    # Load a Python script or module into the debugger
-    def load_script(self, script):
-        """Load a Python script or module into the debugger."""
-        if os.path.isfile(script):
-            # Load script file
-            with open(script, 'r') as file:
-                script_lines = file.readlines()
-        else:
-            # Import module
-            import importlib
-            module = importlib.import_module(script)
-            script_lines = inspect.getsource(module).splitlines()
-        return script_lines
-
-    # Simulate running the debugger through a Python script
-    def run_debugger_script(self, script_lines):
-        """Simulate running the debugger through a Python script."""
+    # Attach the debugger to an Interpreter before it executes
+    def attach(self, interpreter):
+        """Attach to an Interpreter so that it calls back into the debugger at breakpoints."""
+        self.interpreter = interpreter
+        interpreter.debugger = self
+        # Tracing allocations slows every statement down, so it only starts here when asked
+        # for; the first 'memory' then already has a baseline
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.memory = {"snapshot": take_snapshot(), "where": "the start of the program"}
+        self.variables = interpreter.storage
+        self.script_lines = interpreter.source.splitlines() if interpreter.source else []
+        self.statement_lines = [ast.line for ast in interpreter.asts]
+        self.statement_slots = [ast.slot if isinstance(ast, Assign) else None for ast in interpreter.asts]
+        self.line_starts = [0]
+        for line in self.script_lines:
+            self.line_starts.append(self.line_starts[-1] + len(line) + 1)
+        self.stops = None
+        self.current_index = 0
+
+    # Index of the next statement the interpreter has to report
+    def next_stop(self, index):
+        """Return the index of the first statement at or after index that has to stop."""
+        if self.stepping:
+            return index
+        if self.stops is None:
+            # Watched variables only cost anything at the statements that assign them
+            watched = {self.variables.index[name] for name in self.watchpoints}
+            self.stops = [i for i, (line, slot) in enumerate(zip(self.statement_lines, self.statement_slots))
+                          if line in self.breakpoints or slot in watched]
+        position = bisect.bisect_left(self.stops, index)
+        return self.stops[position] if position < len(self.stops) else len(self.statement_lines)
+
+    # Hook called by the Interpreter before a statement returned by next_stop
+    def on_statement(self, interpreter, index):
+        """Pause before statement index unless its breakpoint's condition says otherwise.
+        Returns the index of the statement to execute next."""
+        slot = self.statement_slots[index]
+        if slot is not None and self.interpreter.names[slot] in self.watchpoints:
+            self.pending_write = (index, slot, interpreter.slots[slot])
+        line = self.statement_lines[index]
+        breakpoint = self.breakpoints.get(line)
+        if not self.stepping and (breakpoint is None or not breakpoint.triggered(self.variables)):
+            return index
+        self.stepping = False
+        self.current_index = index
+        self.current_line = line
+        self._break_at_line(line)
+        return self.take_resume(index)
+
+    # Hook called by the Interpreter after each statement it reported to on_statement
+    def after_statement(self, interpreter, index):
+        """Report a write to a watched variable that changed its value.
+        Returns the index of the statement to execute next."""
+        if self.pending_write is None:
+            return index + 1
+        index, slot, old = self.pending_write
+        self.pending_write = None
+        new = interpreter.slots[slot]
+        if old is not UNSET and old == new:
+            return index + 1
+        line, column = self.locate(interpreter.asts[index].start, self.statement_lines[index])
+        old = "<unset>" if old is UNSET else old
+        print(f"Watchpoint '{interpreter.names[slot]}': {old} -> {new} (line {line}, column {column})")
+        self.current_index = index + 1
+        self.current_line = line
+        self.user_command_loop()
+        return self.take_resume(index + 1)
+
+    # Statement to continue from once the command loop returns
+    def take_resume(self, index):
+        """Return the statement a time-travel command moved to, or index if there was none."""
+        if self.resume is None:
+            return index
+        index, self.resume = self.resume, None
+        return index
+
+    # Command loop after the program ended; moving back in time continues execution
+    def finish(self, interpreter):
+        """Let the user inspect the final state, re-running from wherever they travel to."""
+        while True:
+            print("Program finished.")
+            self.current_index = len(self.statement_lines)
+            self.current_line = None
+            self.user_command_loop()
+            if self.resume is None:
+                return
+            interpreter.execute_debug(self.take_resume(0))
+
+    # Move execution to the state just before statement target (record mode only)
+    def travel(self, target):
+        """Rebuild the state before statement target and pause there. Returns True on success."""
+        journal = self.interpreter.journal
+        if journal is None:
+            print("Time travel needs a recording; run with --record.")
+            return False
+        target = max(0, min(target, len(self.statement_lines)))
         try:
-            for line_number, script_line in enumerate(script_lines, start=1):
-                if line_number in self.breakpoints:
-                    self._break_at_line(line_number)
-                for breakpoint in self.conditional_breakpoints:
-                    if breakpoint.condition(self.variables):
-                        self._break_at_line(breakpoint.line_number)
-                        break
-                self.handle_watchpoints()
-
-                # Execute the current line
-                exec(script_line, self.variables, self.variables)
-        except Exception as e:
-            self._handle_exception(e)
+            self.interpreter.seek(target)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+        self.pending_write = None
+        self.resume = target
+        self.stepping = True  # Pause again as soon as statement target is reached
+        return True
+
+    # Find the closest earlier statement with a breakpoint or a watched write
+    def previous_stop(self, index):
+        """Return the index of the last stop before index, or the start of the recorded history."""
+        self.next_stop(index)  # Make sure self.stops is built
+        position = bisect.bisect_left(self.stops, index)
+        if position:
+            return self.stops[position - 1]
+        return self.interpreter.journal.earliest() if self.interpreter.journal is not None else 0
+
+    # Map a source offset to (line, column), both counted from 1
+    def locate(self, offset, line):
+        """Return the line and column of a source offset; line is used if there is no source."""
+        if offset is None or not self.script_lines:
+            return line, 1
+        line = bisect.bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
 
     # Enter the user command loop
     def user_command_loop(self):
-        """Enter the user command loop."""
+        """Enter the user command loop; returns when execution should resume."""
         while True:
-            command = input("Debugger Command (type 'help' for a list of commands): ").lower()
+            try:
+                command = input("Debugger Command (type 'help' for a list of commands): ").strip()
+            except EOFError:
+                return  # No more input: let the program run to completion
             self.command_history.append(command)
             try:
-                self.handle_user_command(command)
+                if self.handle_user_command(command):
+                    return
             except ValueError:
                 print("Error: Invalid input. Please enter a valid command.")
             except Exception as e:
@@ -75,22 +219,61 @@ class Debugger:
 
     # Handle user commands with basic error handling
     def handle_user_command(self, command):
-        """Handle user commands with basic error handling."""
+        """Handle user commands with basic error handling. Returns True to resume execution."""
+        verb = command.split(maxsplit=1)[0].lower() if command else ""
         try:
-            if command == 'help':
+            if verb == 'help':
                 self._display_help()
-            elif command == 'continue':
+            elif verb in ('continue', 'c'):
                 print("Resuming script execution...")
-            # ...
-
-            # Various other commands are handled here
-
-            else:
+                return True
+            elif verb in ('step', 's'):
+                self.stepping = True
+                return True
+            elif verb in ('break', 'b'):
+                self._set_breakpoint(command)
+            elif verb == 'condition':
+                self._set_conditional_breakpoint(command)
+            elif verb == 'ignore':
+                self._set_ignore_count(command)
+            elif verb in ('breakpoints', 'info'):
+                self._display_breakpoints()
+            elif verb == 'clear':
+                self._clear_breakpoint(command)
+            elif verb == 'watch':
+                self._set_watchpoint(command)
+            elif verb == 'unwatch':
+                self._remove_watchpoint(command)
+            elif verb == 'vars':
+                self.inspect_variables()
+            elif verb in ('print', 'p'):
+                print(self.evaluate_expression(command.split(maxsplit=1)[1]))
+            elif verb == 'list':
+                self._display_script_lines(self.script_lines)
+            elif verb in ('reverse-step', 'rs'):
+                return self.travel(self.current_index - 1)
+            elif verb in ('reverse-continue', 'rc'):
+                return self.travel(self.previous_stop(self.current_index))
+            elif verb == 'goto':
+                return self.travel(int(command.split()[1]))
+            elif verb == 'where':
+                if self.current_line:
+                    print(f"Line {self.current_line} (statement {self.current_index})")
+                else:
+                    print("Not running")
+            elif verb == 'memory':
+                self._display_memory()
+            elif verb == 'log_debugging_session':
+                self.log_debugging_session()
+            elif verb in ('quit', 'q'):
+                sys.exit(0)
+            elif verb:
                 print("Invalid command. Type 'help' for a list of commands.")
         except ValueError as ve:
             print(f"Error: Invalid input. {ve}")
-        except Exception as e:
-            print(f"Unexpected error: {e}")
+        except (IndexError, KeyError, NameError, SyntaxError) as e:
+            print(f"Error: {e}")
+        return False
 
     # Display information about variables during debugging
     def inspect_variables(self):
@@ -114,7 +297,7 @@ class Debugger:
     def evaluate_expression(self, expression):
         """Evaluate a Python expression in the current context."""
         try:
-            result = eval(expression, self.variables)
+            result = eval(expression, {}, self.variables)
             return result
         except Exception as e:
             print(f"Error: {e}")
@@ -130,20 +313,56 @@ class Debugger:
 
     # Set a breakpoint at the specified line number
     def _set_breakpoint(self, command):
-        """Set a breakpoint at the specified line number."""
+        """Set a breakpoint at the specified line number: break <line> [if <condition>]."""
+        _, spec = command.split(maxsplit=1)
+        breakpoint = self.add_breakpoint(*parse_breakpoint(spec))
+        print(f"Breakpoint set at {breakpoint}")
+
+    # Register a breakpoint in the per-line index
+    def add_breakpoint(self, line_number, condition=None, ignore_count=0):
+        """Add a breakpoint at line_number, replacing any breakpoint already on that line."""
+        breakpoint = self.breakpoints[line_number] = Breakpoint(line_number, condition, ignore_count)
+        self.stops = None
+        return breakpoint
+
+    # Remove the breakpoint at the specified line number
+    def _clear_breakpoint(self, command):
+        """Remove the breakpoint at the specified line number."""
         _, line_number = command.split()
-        self.breakpoints.add(int(line_number))
-        print(f"Breakpoint set at line {line_number}")
+        if self.breakpoints.pop(int(line_number), None) is None:
+            print(f"No breakpoint at line {line_number}")
+            return
+        self.stops = None
+        print(f"Breakpoint at line {line_number} cleared")
 
     # Set a conditional breakpoint triggered by a specific condition
     def _set_conditional_breakpoint(self, command):
-        """Set a breakpoint triggered by a specific condition."""
-        _, line_number, condition = command.split()
-        self.conditional_breakpoints.append(
-            Breakpoint(int(line_number), lambda: eval(condition, self.variables))
-        )
+        """Set a breakpoint triggered by a specific condition: condition <line> <condition>."""
+        _, line_number, condition = command.split(maxsplit=2)
+        breakpoint = self.breakpoints.get(int(line_number))
+        ignore_count = breakpoint.ignore_count if breakpoint is not None else 0
+        self.add_breakpoint(int(line_number), condition, ignore_count)
         print(f"Condition breakpoint set at line {line_number} with condition: {condition}")
 
+    # Skip the next hits of a breakpoint
+    def _set_ignore_count(self, command):
+        """Ignore the next count hits of the breakpoint at a line: ignore <line> <count>."""
+        _, line_number, count = command.split()
+        breakpoint = self.breakpoints.get(int(line_number))
+        if breakpoint is None:
+            print(f"No breakpoint at line {line_number}")
+            return
+        breakpoint.ignore_count = int(count)
+        print(f"Will ignore next {count} hits of breakpoint at line {line_number}")
+
+    # List the breakpoints with their conditions and hit counts
+    def _display_breakpoints(self):
+        """Display all breakpoints."""
+        if not self.breakpoints:
+            print("No breakpoints.")
+        for line_number in sorted(self.breakpoints):
+            print(f"  - {self.breakpoints[line_number]}")
+
     # Display script lines
     def _display_script_lines(self, script_lines):
         """Display script lines."""
@@ -155,34 +374,66 @@ class Debugger:
     def _display_help(self):
         """Display available debugger commands and their descriptions."""
         print("Available commands:")
-        # ...
-
-        # Display the list of commands with descriptions
-
+        print("  - continue (c): Resume execution until the next breakpoint")
+        print("  - step (s): Execute one statement and pause again")
+        print("  - break (b) <line> [if <condition>]: Set a breakpoint at a line")
+        print("  - condition <line> <condition>: Only stop at a line when the condition is true")
+        print("  - ignore <line> <count>: Do not stop for the next count hits of a breakpoint")
+        print("  - breakpoints: List breakpoints with their hit counts")
+        print("  - clear <line>: Remove the breakpoint at a line")
+        print("  - watch <variable>: Pause whenever an assignment changes a variable")
+        print("  - unwatch <variable>: Remove a watchpoint")
+        print("  - vars: Show all assigned variables")
+        print("  - print (p) <expression>: Evaluate an expression over the variables")
+        print("  - list: Show the program source")
+        print("  - memory: Show memory use and what changed since the last 'memory'")
+        print("  - where: Show the current line and statement index")
+        print("  - reverse-step (rs): Go back to before the previous statement (needs --record)")
+        print("  - reverse-continue (rc): Go back to the previous breakpoint or watched write")
+        print("  - goto <statement>: Go to the state before a statement index")
+        print("  - quit (q): Stop the program")
         print("  - log_debugging_session: Log debugging session information")
 
     # Display information about the memory usage of the running script
     def _display_memory(self):
         """Display information about the memory usage of the running script."""
-        # Implement logic to access and display memory usage information...
-        print("Memory information not implemented yet.")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            print("Started tracing allocations; run 'memory' again at a later pause to see what changed.")
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"Traced memory: {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB)")
+        if self.interpreter is not None:
+            print(f"Storage: {len(self.variables)} variables, "
+                  f"{storage_size(self.interpreter.slots) / 1024:.1f} KiB")
+        snapshot = take_snapshot()
+        where = f"line {self.current_line}" if self.current_line else "the end of the program"
+        if self.memory:
+            print(f"Allocation changes since {self.memory['where']}:")
+            print(format_diff(snapshot, self.memory["snapshot"]))
+        self.memory = {"snapshot": snapshot, "where": where}
 
     # Set a watchpoint to track changes in a specific variable
     def _set_watchpoint(self, command):
         """Set a watchpoint to track changes in a specific variable."""
         _, variable = command.split()
-        self.watchpoints.add(variable)
+        self.add_watchpoint(variable)
         print(f"Watchpoint set for variable '{variable}'.")
 
-    # Check for changes in watchpoint variables and trigger breakpoints
-    def _handle_watchpoints(self):
-        """Check for changes in watchpoint variables and trigger breakpoints."""
-        for variable in self.watchpoints:
-            if self.variables[variable] != self.previous_values.get(variable):
-                self.previous_values[variable] = self.variables[variable]
-                print(f"Variable '{variable}' changed value.")
-                self.user_command_loop()
-                break
+    # Register a watchpoint; only statements assigning the variable will report to the debugger
+    def add_watchpoint(self, variable):
+        """Watch writes to variable."""
+        if self.interpreter is not None and variable not in self.variables.index:
+            raise KeyError(f"the program has no variable '{variable}'")
+        self.watchpoints.add(variable)
+        self.stops = None
+
+    # Remove a watchpoint
+    def _remove_watchpoint(self, command):
+        """Stop watching a variable."""
+        _, variable = command.split()
+        self.watchpoints.discard(variable)
+        self.stops = None
+        print(f"Watchpoint for variable '{variable}' removed.")
 
     # Capture and handle exceptions raised during script execution
     def _handle_exception(self, e):
@@ -269,15 +520,23 @@ class Debugger:
         """Log debugging session information."""
         logging.info("Debugging session information:")
         logging.info(f"Breakpoints: {self.breakpoints}")
-        logging.info(f"Conditional Breakpoints: {self.conditional_breakpoints}")
         logging.info(f"Watchpoints: {self.watchpoints}")
         logging.info(f"Command History: {self.command_history}")
         # Add more information as needed
         print("Debugging session information logged.")
 
+# Parse "<line>" or "<line> if <condition>"
+def parse_breakpoint(spec):
+    """Split a breakpoint specification into (line number, condition or None)."""
+    line_number, _, condition = spec.partition(" if ")
+    return int(line_number), condition.strip() or None
+
 # Usage example
 if __name__ == "__main__":
+    from compiler import compile_source, parse_args
+    args = parse_args([sys.argv[1], "--no-cache"])
+    interpreter = compile_source(args.source, args)
     debugger = Debugger()
-    script_lines = debugger.load_script("your_script.py")
-    debugger.run_debugger_script(script_lines)
+    debugger.attach(interpreter)
     debugger.user_command_loop()
+    interpreter.execute()
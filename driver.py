@@ -0,0 +1,116 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Multi-file batch driver: runs many programs across a pool of reused worker processes.
+#
+#   python driver.py a.txt b.txt --manifest nightly.txt --jobs 8 --summary summary.json -- -O2
+#
+# Options after "--" are passed to every compilation as compiler.py options.
+
+_worker_args = None
+
+def init_worker(compiler_options):
+    # Runs once per worker process: import the compiler stack and parse the shared options,
+    # so each script only pays for its own lex/parse/execute
+    global _worker_args
+    import compiler
+    _worker_args = compiler.parse_args(["", *compiler_options])
+
+def run_file(path):
+    # Compile and run one program, capturing its output; never raises, so a failing script
+    # (including the sys.exit calls in the Lexer and Parser) cannot take down the batch
+    import compiler
+    args = _worker_args
+    result = {"path": path, "status": "ok", "error": None,
+              "compile_time": 0.0, "execute_time": 0.0, "total_time": 0.0}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    timings = {}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            with open(path) as file:
+                source = file.read()
+            if compiler.run_program(source, args, timings=timings) is None:
+                result["status"] = "invalid"
+    except SystemExit as e:
+        result["status"] = "error"
+        result["error"] = str(e.code) if e.code is not None else "exited"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["total_time"] = time.perf_counter() - start
+    result["compile_time"] = timings.get("compile", 0.0)
+    result["execute_time"] = timings.get("execute", 0.0)
+    result["stdout"] = stdout.getvalue()
+    result["stderr"] = stderr.getvalue()
+    return result
+
+def read_manifest(path):
+    # A manifest is a JSON list of paths or a text file with one path per line;
+    # relative paths are taken relative to the manifest
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as file:
+        if path.endswith(".json"):
+            entries = json.load(file)
+        else:
+            entries = [line.strip() for line in file]
+            entries = [entry for entry in entries if entry and not entry.startswith("#")]
+    return [os.path.join(base, entry) for entry in entries]
+
+def run_batch(paths, jobs=None, compiler_options=()):
+    # Run every path on a process pool and return the aggregated summary
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(list(compiler_options),)) as pool:
+        results = list(pool.map(run_file, paths, chunksize=chunksize))
+    failed = sum(1 for result in results if result["status"] != "ok")
+    return {
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "jobs": jobs,
+        "wall_time": time.perf_counter() - start,
+        "files": results,
+    }
+
+def main(argv=None):
+    from compiler import split_options
+    argv, compiler_options = split_options(sys.argv[1:] if argv is None else argv)
+
+    arg_parser = argparse.ArgumentParser(description="Run many programs on a process pool.")
+    arg_parser.add_argument("files", nargs="*", help="program files to run")
+    arg_parser.add_argument("--manifest", action="append", default=[],
+                            help="file listing programs to run (text, one per line, or a JSON list)")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=None,
+                            help="number of worker processes (default: CPU count)")
+    arg_parser.add_argument("--summary", default="-",
+                            help="where to write the JSON summary (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    paths = list(args.files)
+    for manifest in args.manifest:
+        paths.extend(read_manifest(manifest))
+    if not paths:
+        arg_parser.error("no programs given")
+
+    summary = run_batch(paths, args.jobs, compiler_options)
+    if args.summary == "-":
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.summary, "w") as file:
+            json.dump(summary, file, indent=2)
+        print(f"{summary['succeeded']}/{summary['total']} programs succeeded "
+              f"in {summary['wall_time']:.2f}s; summary written to {args.summary}")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+from lexer import Lexer
+from parser_1 import Parser, Assign
+from optimizer import names_read
+
+# Incremental front end for the IDE. Statements never span lines (each ends at TT_NWL),
+# so a program is kept as one record per source line holding that line's AST or its
+# lex/parse error. An edit names the lines it replaced (the IDE takes them from the
+# editor's insert and delete commands); only the new lines are lexed and parsed and their
+# records are spliced into the list, while the untouched lines keep their ASTs.
+#
+# Name errors depend on the lines above, so every CHECKPOINT_INTERVAL lines a record also
+# keeps a copy of the names assigned above it. After an edit the name check starts from the
+# nearest copy above the edit. Below the edit only the names whose definedness the edit
+# changed matter: lines reading one of them are rechecked, and the check stops once each
+# has been assigned again, which for most edits is right away.
+
+CHECKPOINT_INTERVAL = 1024
+
+class Line:
+    # Analysis of one source line
+    __slots__ = ("text", "statement", "error", "reads", "assigns", "checkpoint", "problems")
+
+    def __init__(self, text):
+        self.text = text
+        self.statement = None  # Assign or Print, None for a blank line or an error
+        self.error = None  # Lexing or parsing error message
+        self.reads = frozenset()  # Names the statement reads
+        self.assigns = None  # Name the statement assigns
+        self.checkpoint = None  # Names assigned on the lines above, on a checkpoint line
+        self.problems = None  # Messages of the line's diagnostics, set by Document.check
+
+def analyze(text):
+    # Lex and parse one line on its own; the Lexer and Parser report errors with
+    # sys.exit, which is turned into the line's error. The line is given its newline
+    # back: at the very end of the input the parser takes TT_EOF as an operand, which
+    # would accept an incomplete statement such as "b = a +"
+    line = Line(text)
+    try:
+        statements = Parser(Lexer(text + "\n").getTokenStream()).runParse()
+    except SystemExit as e:
+        line.error = str(e.code).strip() if e.code is not None else "invalid statement"
+        return line
+    if statements:
+        line.statement = statements[0]
+        line.reads = set(names_read(line.statement.value))
+        if isinstance(line.statement, Assign):
+            line.assigns = line.statement.variable
+    return line
+
+class Document:
+
+    def __init__(self, text=""):
+        self.lines = []
+        self.errors = 0  # Lines with a lexing or parsing error
+        self.problem_count = 0  # Diagnostics over all lines
+        self.first = 0  # No line above this index has a diagnostic
+        self.edit(0, 0, text.split("\n"))
+
+    def edit(self, start, stop, texts):
+        # Replace lines start..stop (0-based, stop exclusive) with the given line texts.
+        # Returns the (first, last) line numbers whose diagnostics were rechecked, last
+        # exclusive; the diagnostics of every other line are unchanged
+        lines = self.lines
+        removed = set()
+        for line in lines[start:stop]:
+            self.errors -= line.error is not None
+            self.problem_count -= len(line.problems)
+            if line.assigns is not None:
+                removed.add(line.assigns)
+        new = [analyze(text) for text in texts]
+        self.errors += sum(line.error is not None for line in new)
+        lines[start:stop] = new
+        end, found = self.check(start, start + len(new), removed)
+
+        # Keep first a lower bound of the first line with a diagnostic
+        delta = len(new) - (stop - start)
+        if self.first >= start:
+            if found is not None:
+                self.first = found
+            elif self.first >= end - delta:
+                self.first += delta
+            else:
+                self.first = end
+        return start + 1, end + 1
+
+    def check(self, start, stop, removed=()):
+        # Recheck the names from line start on; the lines start..stop are new, and the
+        # lines they replaced assigned the names in removed. Returns the index after the
+        # last line checked and the index of the first line from start on with a diagnostic
+        # (None if there is none). The names assigned above a line are those of the
+        # checkpoint above it (base) plus the ones assigned since (extra)
+        lines = self.lines
+        index = start
+        while index > 0 and lines[index - 1].checkpoint is None:
+            index -= 1
+        if index:
+            index -= 1
+            base = lines[index].checkpoint
+        else:
+            base = frozenset()
+        extra = set()
+        for line in lines[index:start]:
+            if line.assigns is not None:
+                extra.add(line.assigns)
+        since = start - index  # Lines since the checkpoint
+
+        # Names assigned above the current line before the edit but not after it, or the
+        # other way around; only lines reading one of them need their names rechecked
+        changed = {name for name in removed if name not in base and name not in extra}
+        found = None
+        index = start
+        while index < len(lines):
+            line = lines[index]
+            if index < stop:
+                recheck = True
+            elif not changed:
+                break
+            else:
+                recheck = line.error is None and not changed.isdisjoint(line.reads)
+                if recheck:
+                    self.problem_count -= len(line.problems)
+            if line.checkpoint is not None or since >= CHECKPOINT_INTERVAL:
+                base = line.checkpoint = base | extra
+                extra = set()
+                since = 0
+            if recheck:
+                if line.error is not None:
+                    line.problems = [line.error]
+                else:
+                    line.problems = [f"Name Error: '{name}' doesn't exist" for name in sorted(line.reads)
+                                     if name not in base and name not in extra]
+                self.problem_count += len(line.problems)
+            if line.problems and found is None:
+                found = index
+            name = line.assigns
+            if name is not None and name not in base and name not in extra:
+                extra.add(name)
+                if index < stop:
+                    changed.symmetric_difference_update((name,))
+                else:
+                    changed.discard(name)
+            elif index >= stop:
+                changed.discard(name)
+            since += 1
+            index += 1
+        return index, found
+
+    def problems(self, first, last):
+        # (line, message) for the diagnostics of lines first..last (line numbers, last
+        # exclusive), e.g. the range an edit returned
+        for number in range(first, min(last, len(self.lines) + 1)):
+            for message in self.lines[number - 1].problems:
+                yield number, message
+
+    def first_problem(self):
+        # (line, message) of the first diagnostic, or None. The scan starts at self.first,
+        # which only falls behind when the first diagnostic was just fixed
+        if not self.problem_count:
+            return None
+        index = self.first
+        while not self.lines[index].problems:
+            index += 1
+        self.first = index
+        return index + 1, self.lines[index].problems[0]
+
+    def text(self):
+        # The program source, as the editor holds it
+        return "\n".join(line.text for line in self.lines) + "\n"
+
+    def statements(self):
+        # The program's ASTs, numbered by their current source line; only complete when the
+        # document has no lexing or parsing errors
+        for number, line in enumerate(self.lines, 1):
+            if line.statement is not None:
+                line.statement.line = number
+                yield line.statement
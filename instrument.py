@@ -0,0 +1,167 @@
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from parser_1 import Node, BiNode, UnaryNode, Assign, OPS
+from interpreter import discard
+
+class NullStats:
+    # Stand-in used when instrumentation is off: phase() is a shared no-op context manager,
+    # so the disabled cost is one method call per compiler phase
+
+    enabled = False
+
+    def phase(self, name, allocations=None):
+        return nullcontext()
+
+NO_STATS = NullStats()
+
+class Stats:
+    # Instrumentation for one compiler run: wall time and allocations per phase, plus
+    # execution counts and cumulative time per AST node type and per source line. The
+    # program itself runs on the selected backend (execute); the node and line counts come
+    # from a separate instrumented re-run with the tree evaluator (instrumented_run), whose
+    # times are only comparable with each other
+
+    enabled = True
+
+    def __init__(self, trace_allocations=True):
+        self.trace_allocations = trace_allocations
+        self.origin = time.perf_counter()
+        self.phases = []
+        # key -> [count, cumulative seconds]
+        self.nodes = defaultdict(lambda: [0, 0.0])
+        self.lines = defaultdict(lambda: [0, 0.0])
+
+    @contextmanager
+    def phase(self, name, allocations=None):
+        # allocations=False times the phase without tracemalloc, which slows Python code
+        # down several times; the default follows trace_allocations
+        trace = self.trace_allocations if allocations is None else allocations
+        started_tracing = trace and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = {"name": name, "start": start - self.origin, "time": elapsed}
+            if trace:
+                current, peak = tracemalloc.get_traced_memory()
+                record["allocated"] = current - before
+                record["peak"] = peak - before
+            if started_tracing:
+                tracemalloc.stop()
+            self.phases.append(record)
+
+    def execute(self, interpreter):
+        # The measured run: the selected backend, uninstrumented
+        interpreter.execute_backend()
+
+    def instrumented_run(self, interpreter):
+        # Run the program a second time through the instrumented tree evaluator to count
+        # and time every node and source line. Its output is discarded and the variables
+        # are put back afterwards, so the real run's results are untouched
+        clock = time.perf_counter
+        nodes, lines = self.nodes, self.lines
+        slots, write = interpreter.slots[:], interpreter.write
+        interpreter.reset()
+        interpreter.write = discard
+        try:
+            for statement in interpreter.asts:
+                start = clock()
+                value = self.evaluate(statement.value, interpreter)
+                if isinstance(statement, Assign):
+                    interpreter.slots[statement.slot] = value
+                else:
+                    interpreter.write(value)
+                elapsed = clock() - start
+                entry = nodes[type(statement).__name__]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry = lines[statement.line]
+                entry[0] += 1
+                entry[1] += elapsed
+        finally:
+            interpreter.slots[:] = slots
+            interpreter.write = write
+
+    def evaluate(self, node, interpreter):
+        # Post-order evaluation with explicit stacks that counts every node and times it
+        # including its operands. stack holds (node, None) for nodes still to be visited
+        # and (node, start time) for operators waiting for their operands
+        clock = time.perf_counter
+        nodes = self.nodes
+        stack = [(node, None)]
+        values = []
+        while stack:
+            node, start = stack.pop()
+            if start is None:
+                start = clock()
+                if isinstance(node, BiNode):
+                    stack.append((node, start))
+                    stack.append((node.right_node, None))
+                    stack.append((node.left_node, None))
+                    continue
+                if isinstance(node, UnaryNode):
+                    stack.append((node, start))
+                    stack.append((node.operand, None))
+                    continue
+                if not isinstance(node, Node):
+                    raise TypeError(f"Cannot evaluate {node!r}")
+                values.append(node.read(interpreter))
+            elif isinstance(node, BiNode):
+                right = values.pop()
+                values[-1] = OPS[node.op_tok.type](values[-1], right)
+            else:
+                values[-1] = -values[-1]
+            entry = nodes[type(node).__name__]
+            entry[0] += 1
+            entry[1] += clock() - start
+        return values[0]
+
+    def to_json(self):
+        # Chrome trace-event format (chrome://tracing, Perfetto) for the phases, with the
+        # node and line tables alongside
+        events = [{"name": phase["name"], "ph": "X", "pid": 0, "tid": 0,
+                   "ts": phase["start"] * 1e6, "dur": phase["time"] * 1e6,
+                   "args": {key: value for key, value in phase.items() if key in ("allocated", "peak")}}
+                  for phase in self.phases]
+        return {
+            "traceEvents": events,
+            "phases": self.phases,
+            "instrumented_run": "node and line counts and times come from a separate run of the "
+                                "instrumented tree evaluator, not the selected backend",
+            "nodes": {name: {"count": count, "time": total} for name, (count, total) in self.nodes.items()},
+            "lines": {str(line): {"count": count, "time": total} for line, (count, total) in sorted(self.lines.items())},
+        }
+
+    def write_trace(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_json(), file, indent=2)
+
+    def summary(self, top_lines=10):
+        rows = ["Phase            time (ms)   allocated (KiB)   peak (KiB)"]
+        for phase in self.phases:
+            allocated = f"{phase['allocated'] / 1024:15.1f}" if "allocated" in phase else f"{'-':>15}"
+            peak = f"{phase['peak'] / 1024:12.1f}" if "peak" in phase else f"{'-':>12}"
+            rows.append(f"{phase['name']:<15} {phase['time'] * 1000:10.3f}   {allocated}   {peak}")
+        if self.nodes:
+            rows.append("")
+            rows.append("Instrumented re-run (tree evaluator, not the selected backend)")
+            rows.append("Node type        count   cumulative (ms)")
+            for name, (count, total) in sorted(self.nodes.items(), key=lambda item: -item[1][1]):
+                rows.append(f"{name:<12} {count:9d}   {total * 1000:15.3f}")
+        if self.lines:
+            rows.append("")
+            rows.append(f"Slowest lines in the instrumented re-run (top {top_lines})")
+            rows.append("Line             count   cumulative (ms)")
+            slowest = sorted(self.lines.items(), key=lambda item: -item[1][1])[:top_lines]
+            for line, (count, total) in slowest:
+                rows.append(f"{line:<12} {count:9d}   {total * 1000:15.3f}")
+        return "\n".join(rows)
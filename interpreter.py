@@ -1,11 +1,265 @@
+from collections.abc import MutableMapping
+from bytecode import (
+    CodeGen, compile_program, LOAD_CONST, LOAD_SLOT, STORE_SLOT, BINARY_ADD, BINARY_SUB,
+    BINARY_MUL, BINARY_DIV, BINARY_POW, PRINT, MARK, UNARY_NEG,
+)
+from parser_1 import Assign
+from resolver import Resolver
+from pybackend import compile_python, run_python
+
+# Marker for a slot whose variable has not been assigned yet
+UNSET = object()
+
 class Interpreter:
 
-    def __init__(self, asts):
-        # Constructor initializes the Interpreter with a list of Abstract Syntax Trees (ASTs) and an empty storage dictionary
+    def __init__(self, asts, mode="vm", source=None, names=None, inputs=()):
+        # Constructor initializes the Interpreter with a list of Abstract Syntax Trees (ASTs).
+        # Variables are resolved to slot indices up front (undefined names are reported here,
+        # before anything runs) and live in the preallocated self.slots list; self.storage is
+        # a dict-style view of it. mode is "vm" (compile to bytecode and run it on the stack VM),
+        # "tree" (reference tree walker) or "python" (transpile to a Python code object; the
+        # optional source text gives it column information). Passing names skips resolution
+        # for trees that were already resolved, e.g. when loaded from the compilation cache.
+        # inputs names variables that are set through storage before the program runs.
+        # Print statements send their values to self.write, the builtin print by default.
+        # Setting self.stats to an instrument.Stats lets it drive execution (Stats.execute;
+        # the memory profiler runs one statement at a time). Attaching a
+        # Debugger (Debugger.attach sets self.debugger) makes execute stop where it asks to,
+        # and setting self.journal to a journal.Journal turns on record mode for time travel
         self.asts = asts
-        self.storage = {}
+        self.mode = mode
+        self.source = source
+        self.code = None
+        self.names = names if names is not None else Resolver(inputs).resolve(asts)
+        self.slots = [UNSET] * len(self.names)
+        self.storage = StorageView(self.names, self.slots)
+        self.write = print
+        self.stats = None
+        self.debugger = None
+        self.journal = None
+        self.vm_code = None  # Bytecode for python-backend programs that must stop between statements
+
+    def reset(self):
+        # Forget all variable values so the program can be executed again
+        self.slots[:] = [UNSET] * len(self.slots)
+
+    def compile(self):
+        # Build the executable form for the current mode (the tree walker needs none)
+        if self.code is None:
+            if self.mode == "python":
+                self.code = compile_python(self.asts, self.names, self.source)
+            elif self.mode != "tree":
+                self.code = compile_program(self.asts, self.names)
+        return self.code
 
     def execute(self):
-        # Execute method iterates through each AST and calls its read method with the current Interpreter instance
+        if self.debugger is not None or self.journal is not None:
+            self.execute_debug()
+        elif self.stats is not None:
+            self.stats.execute(self)
+        else:
+            self.execute_backend()
+
+    def execute_backend(self):
+        # Run the whole program on the selected backend
+        if self.mode == "tree":
+            self.execute_tree()
+        elif self.mode == "python":
+            values = run_python(self.compile(), self.slots, self.write)
+            self.slots[:len(values)] = values
+        else:
+            self.run(self.compile())
+
+    def execute_debug(self, start=0):
+        # Debugger session: run at full speed up to the next statement the debugger wants to
+        # see (a breakpoint line, an assignment to a watched variable, or every statement
+        # while stepping), run that statement between its on_statement and after_statement
+        # hooks, then carry on. Each hook returns the index to continue from, which differs
+        # from the natural one after the debugger has moved through time (see seek).
+        debugger = self.debugger
+        code = self.statement_code()
+        index, count = start, len(self.asts)
+        if debugger is None:
+            self.run_statements(code, index, count)
+            return
+        index = debugger.take_resume(index)  # The user may have moved before the program started
+        while index < count:
+            stop = debugger.next_stop(index)
+            self.run_statements(code, index, stop)
+            if stop >= count:
+                break
+            index = debugger.on_statement(self, stop)
+            if index != stop:
+                continue
+            self.run_statements(code, stop, stop + 1)
+            index = debugger.after_statement(self, stop)
+
+    def statement_code(self):
+        # What run_statements executes: None for the tree walker, bytecode otherwise.
+        # Python-backend programs run on the VM here, because their single code object
+        # cannot stop between statements
+        if self.mode == "tree":
+            return None
+        if self.mode == "vm":
+            return self.compile()
+        if self.vm_code is None:
+            self.vm_code = compile_program(self.asts, self.names)
+        return self.vm_code
+
+    def run_statements(self, code, start, stop):
+        # Execute statements start:stop with the tree walker, or on the VM when code is given
+        if start >= stop:
+            return
+        if self.journal is not None:
+            self.run_recorded(code, start, stop)
+        elif code is None:
+            for ast in self.asts[start:stop]:
+                ast.read(self)
+        else:
+            self.run(code, code.stmt_offsets[start], code.stmt_offsets[stop])
+
+    def run_recorded(self, code, start, stop):
+        # Record mode: execute one statement at a time, logging what each Assign overwrites
+        # and checkpointing the slots periodically. Statements that already ran once are
+        # being replayed after a rewind, so their output is not repeated
+        journal = self.journal
+        slots = self.slots
+        write = self.write
+        for index in range(start, stop):
+            if index % journal.checkpoint_interval == 0:
+                journal.checkpoint(index, slots)
+            ast = self.asts[index]
+            if isinstance(ast, Assign):
+                journal.record(index, ast.slot, slots[ast.slot])
+            self.write = write if index >= journal.furthest else discard
+            try:
+                if code is None:
+                    ast.read(self)
+                else:
+                    self.run(code, code.stmt_offsets[index], code.stmt_offsets[index + 1])
+            finally:
+                self.write = write
+            journal.position = index + 1
+            journal.furthest = max(journal.furthest, index + 1)
+
+    def seek(self, target):
+        # Time travel in record mode: bring the slots to their state just before statement
+        # target, undoing journaled writes (or restoring a checkpoint) to go back and
+        # replaying statements to go forward. Raises ValueError if that history is gone
+        journal = self.journal
+        start = journal.position
+        if target < start:
+            start = journal.rewind(self.slots, target)
+        self.run_statements(self.statement_code(), start, target)
+
+    def execute_stream(self, statements):
+        # Pipelined mode: resolve, compile and run each statement as soon as it arrives from
+        # a statement generator (e.g. Parser.iter_statements over Lexer.iter_tokens), then let
+        # it go. Memory stays bounded by the number of variables rather than program size.
+        # The tree walker runs statements directly; every other mode uses the VM.
+        resolver = Resolver(self.names)
+        for statement in statements:
+            resolver.resolve((statement,))
+            for name in resolver.names[len(self.slots):]:
+                self.storage.add(name)
+            if self.mode == "tree":
+                statement.read(self)
+            else:
+                self.run(CodeGen().compile((statement,), self.names))
+
+    def execute_tree(self):
+        # Reference mode: iterate through each AST and call its read method with the current Interpreter instance
         for ast in self.asts:
-            ast.read(self)
\ No newline at end of file
+            ast.read(self)
+
+    def run(self, code, start=0, stop=None):
+        # Stack VM: execute code.instructions[start:stop] with opcode dispatch.
+        # Programs are straight-line, so the loop simply iterates the instructions;
+        # the branches are ordered by how often each opcode occurs in practice.
+        # statement is only maintained for marked code, where the profiler reads it.
+        instructions = code.instructions
+        if start or stop is not None:
+            instructions = instructions[start:stop]
+        consts = code.consts
+        slots = self.slots
+        write = self.write
+        stack = []
+        push, pop = stack.append, stack.pop
+        statement = None
+
+        for op, arg in instructions:
+            if op == LOAD_SLOT:
+                push(slots[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == BINARY_ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == BINARY_MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == STORE_SLOT:
+                slots[arg] = pop()
+            elif op == BINARY_SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == BINARY_DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif op == BINARY_POW:
+                right = pop()
+                stack[-1] = stack[-1] ** right
+            elif op == UNARY_NEG:
+                stack[-1] = -stack[-1]
+            elif op == PRINT:
+                write(pop())
+            elif op == MARK:
+                statement = arg
+
+def discard(value):
+    # Output sink for replayed statements
+    pass
+
+class StorageView(MutableMapping):
+    # Dict-style view of the Interpreter's slot list keyed by variable name, kept for the
+    # debugger and for callers that used the old storage dictionary. Unassigned slots are
+    # hidden; assigning a name the Resolver has not seen appends a new slot.
+
+    def __init__(self, names, slots):
+        self.names = names
+        self.slots = slots
+        self.index = {name: slot for slot, name in enumerate(names)}
+
+    def __getitem__(self, name):
+        value = self.slots[self.index[name]]
+        if value is UNSET:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        slot = self.index.get(name)
+        if slot is None:
+            slot = self.add(name)
+        self.slots[slot] = value
+
+    def add(self, name):
+        # Append an unassigned slot for a new variable and return its index
+        slot = self.index[name] = len(self.slots)
+        self.names.append(name)
+        self.slots.append(UNSET)
+        return slot
+
+    def __delitem__(self, name):
+        self[name]  # Raise KeyError for unknown or unassigned names
+        self.slots[self.index[name]] = UNSET
+
+    def __iter__(self):
+        for name, value in zip(self.names, self.slots):
+            if value is not UNSET:
+                yield name
+
+    def __len__(self):
+        return sum(1 for value in self.slots if value is not UNSET)
+
+    def __repr__(self):
+        return repr(dict(self))
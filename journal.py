@@ -0,0 +1,63 @@
+from collections import deque
+
+# State journal for time-travel debugging. In record mode the Interpreter logs, before
+# each Assign runs, the slot it writes and the value being overwritten. Undoing those
+# deltas newest-first rebuilds any earlier point; periodic checkpoints (copies of the
+# slot list) bound how far back a rebuild can reach once old deltas have been evicted.
+# Both are ring buffers, so memory stays bounded on long runs: at most capacity deltas
+# and capacity // checkpoint_interval checkpoints.
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+class Journal:
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.capacity = capacity
+        self.checkpoint_interval = checkpoint_interval
+        self.writes = deque()  # (statement index, slot, old value), oldest first
+        self.checkpoints = deque(maxlen=max(1, capacity // checkpoint_interval))  # (index, slots)
+        self.position = 0  # Index of the next statement to execute
+        self.furthest = 0  # Statements before this index have run at least once
+        self.horizon = 0  # Every write from this statement on is still in the journal
+
+    def __len__(self):
+        return len(self.writes)
+
+    def record(self, index, slot, old):
+        # Log the value that statement index is about to overwrite
+        if len(self.writes) >= self.capacity:
+            self.horizon = self.writes.popleft()[0] + 1
+        self.writes.append((index, slot, old))
+
+    def checkpoint(self, index, slots):
+        # Remember the state just before statement index
+        if not self.checkpoints or self.checkpoints[-1][0] < index:
+            self.checkpoints.append((index, list(slots)))
+
+    def earliest(self):
+        # First statement index whose preceding state can still be rebuilt
+        if self.checkpoints:
+            return min(self.horizon, self.checkpoints[0][0])
+        return self.horizon
+
+    def rewind(self, slots, target):
+        # Move slots back to the state before statement target. Returns the index execution
+        # has to be replayed from to get there: target itself when the deltas reach back
+        # far enough, otherwise the checkpoint that was restored
+        if target < self.earliest():
+            raise ValueError(f"history before statement {self.earliest()} has been discarded")
+        start, saved = target, None
+        if target < self.horizon:
+            start, saved = next(checkpoint for checkpoint in reversed(self.checkpoints) if checkpoint[0] <= target)
+        writes = self.writes
+        while writes and writes[-1][0] >= start:
+            _, slot, old = writes.pop()
+            slots[slot] = old
+        if saved is not None:
+            slots[:len(saved)] = saved
+            self.horizon = start  # Replaying from the checkpoint records every write again
+        while self.checkpoints and self.checkpoints[-1][0] > start:
+            self.checkpoints.pop()
+        self.position = start
+        return start
@@ -1,76 +1,214 @@
+import mmap
+import re
 import sys
+from array import array
+
+# Token patterns, tried in order by a single alternation so that each match
+# consumes a whole lexeme (identifier, number, operator or newline) at once.
+TOKEN_SPEC = [
+    ("TT_NUMBER", r"\d+(?:\.\d*)?|\.\d+"),
+    ("TT_IDENT", r"[A-Za-z_]\w*"),
+    ("TT_POW", r"\*\*"),
+    ("TT_PLUS", r"\+"),
+    ("TT_MINUS", r"-"),
+    ("TT_MULT", r"\*"),
+    ("TT_DIV", r"/"),
+    ("TT_EQ", r"="),
+    ("TT_LPAREN", r"\("),
+    ("TT_RPAREN", r"\)"),
+    ("TT_NWL", r"\n"),
+    ("SKIP", r"[ \t\r]+|#[^\n]*"),
+    ("MISMATCH", r"."),
+]
+TOKEN_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPEC))
+# The same patterns over bytes, for lexing a memory-mapped file (identifiers are ASCII-only)
+TOKEN_BYTES_RE = re.compile(TOKEN_RE.pattern.encode())
+
+# Bytes of a mapped file lexed per chunk; chunks end at a newline, which no token spans
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Small-integer token kinds used by the compact TokenStream and the Parser.
+# TOKEN_KINDS[kind] gives back the string tag carried by Token.type.
+TOKEN_KINDS = (
+    "TT_EOF", "TT_NWL", "TT_NUMBER", "TT_IDENT", "TT_KEYW", "TT_PLUS", "TT_MINUS",
+    "TT_MULT", "TT_DIV", "TT_POW", "TT_EQ", "TT_LPAREN", "TT_RPAREN",
+)
+(K_EOF, K_NWL, K_NUMBER, K_IDENT, K_KEYW, K_PLUS, K_MINUS,
+ K_MULT, K_DIV, K_POW, K_EQ, K_LPAREN, K_RPAREN) = range(len(TOKEN_KINDS))
+KIND = {name: kind for kind, name in enumerate(TOKEN_KINDS)}
+
+# Regex group number -> token kind (-1 for skipped text, -2 for an unknown character).
+GROUP_KINDS = [None] + [KIND.get(name, -1 if name == "SKIP" else -2) for name, _ in TOKEN_SPEC]
 
 # Define a Lexer class for tokenizing input.
 class Lexer:
     def __init__(self, input):
-        # Initialize Lexer with input, current character, position, token list, and error state.
+        # Initialize Lexer with input, token list, and error state.
         self.source = input
-        self.curChar = ''
-        self.curPos = -1
         self.tokenList = []
         self.error = None
-        self.nextChar()
-
-    # Move to the next character in the input.
-    def nextChar(self):
-        self.curPos += 1
-        if self.curPos >= len(self.source):
-            self.curChar = '\0'
-        else:
-            self.curChar = self.source[self.curPos]
-
-    # Peek at the next character without moving the position.
-    def peek(self):
-        if self.curPos + 1 >= len(self.source):
-            return '\0'
-        return self.source[self.curPos + 1]
 
     # Abort lexing with an error message.
     def abort(self, message):
         sys.exit("Lexing error. " + message)
 
-    # Skip whitespaces and carriage return characters.
-    def skipWhitespace(self):
-        while self.curChar == ' ' or self.curChar == '\r':
-            self.nextChar()
+    # Lazily yield tokens from the input source, one regex match per lexeme.
+    def iter_tokens(self):
+        source = self.source
+        for match in TOKEN_RE.finditer(source):
+            kind = match.lastgroup
+            if kind == "SKIP":
+                continue
+            start = match.start()
+            end = match.end() - 1
+            if kind == "TT_IDENT":
+                value = match.group()
+                if isKeyWord(value):
+                    yield Token("TT_KEYW", value, start, end)
+                else:
+                    yield IdentToken(kind, value, start, end)
+            elif kind == "MISMATCH":
+                self.abort("Unknown token: " + match.group())
+            else:
+                yield Token(kind, match.group(), start, end)
 
-    # Skip comments starting with '#'.
-    def skipComment(self):
-        if self.curChar == '#':
-            while self.curChar != '\n':
-                self.nextChar()
+        # Finish with an end-of-file token positioned after the last character.
+        yield Token("TT_EOF", None, len(source), len(source))
 
     # Get tokens from the input source.
     def getTokens(self):
-        while self.curChar != '\0':
-            self.skipWhitespace()
-            self.skipComment()
-            token = None
-
-            # Check for various token types and create corresponding Token objects.
-            if self.curChar == '+':
-                token = Token("TT_PLUS", self.curChar, self.curPos, self.curPos)
-                self.tokenList.append(token)
-            elif self.curChar == '-':
-                # Similar logic for other operators and symbols...
-                token = Token("TT_MINUS", self.curChar, self.curPos, self.curPos)
-                self.tokenList.append(token)
-            elif self.curChar.isalpha():
-                # Handle identifiers and keywords...
-                token = Token("TT_IDENTIFIER", self.curChar, self.curPos, self.curPos)
-                self.tokenList.append(token)
-            else:
-                self.abort("Unknown token: " + self.curChar)
+        self.tokenList = list(self.iter_tokens())
+        return self.tokenList
 
-            self.nextChar()
+    # Tokenize the whole input into a compact, array-backed TokenStream.
+    def getTokenStream(self):
+        stream = TokenStream(self.source)
+        kinds, starts, ends, values = stream.kinds, stream.starts, stream.ends, stream.values
+        group_kinds = GROUP_KINDS
+        intern = sys.intern
+
+        for match in TOKEN_RE.finditer(self.source):
+            kind = group_kinds[match.lastindex]
+            if kind < 0:
+                if kind == -1:
+                    continue
+                self.abort("Unknown token: " + match.group())
+            value = None
+            if kind == K_IDENT:
+                # Identifiers are interned so repeated names share one string object.
+                value = intern(match.group())
+                if isKeyWord(value):
+                    kind = K_KEYW
+            kinds.append(kind)
+            starts.append(match.start())
+            ends.append(match.end() - 1)
+            values.append(value)
+
+        kinds.append(K_EOF)
+        starts.append(len(self.source))
+        ends.append(len(self.source))
+        values.append(None)
+        return stream
+
+
+# Lexer for a program file read through mmap instead of a str. The regex runs directly
+# on the mapped bytes, one chunk at a time, so token positions are file offsets and only
+# the current chunk has to be resident: pages of finished chunks are released again.
+class FileLexer:
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
 
-        # Append end-of-file token and return the token list.
-        self.tokenList.append(Token("TT_EOF"))
-        return self.tokenList
+    # Abort lexing with an error message.
+    def abort(self, message):
+        sys.exit("Lexing error. " + message)
+
+    # Lazily yield tokens from the file, like Lexer.iter_tokens.
+    def iter_tokens(self):
+        with open(self.path, "rb") as file:
+            size = file.seek(0, 2)
+            if size == 0:
+                yield Token("TT_EOF", None, 0, 0)
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from self.iter_mapped(buffer, size)
+                yield Token("TT_EOF", None, size, size)
+
+    # Tokens of the mapped buffer, chunk by chunk.
+    def iter_mapped(self, buffer, size):
+        release = getattr(mmap, "MADV_DONTNEED", None)
+        released = 0  # Pages before this offset have been handed back
+        start = 0
+        while start < size:
+            end = buffer.find(b"\n", min(start + self.chunk_size, size) - 1)
+            end = size if end < 0 else end + 1
+            for match in TOKEN_BYTES_RE.finditer(buffer, start, end):
+                kind = match.lastgroup
+                if kind == "SKIP":
+                    continue
+                token_start = match.start()
+                token_end = match.end() - 1
+                if kind == "TT_IDENT":
+                    value = match.group().decode("ascii")
+                    if isKeyWord(value):
+                        yield Token("TT_KEYW", value, token_start, token_end)
+                    else:
+                        yield IdentToken(kind, value, token_start, token_end)
+                elif kind == "MISMATCH":
+                    self.abort("Unknown token: " + match.group().decode("utf-8", "replace"))
+                else:
+                    yield Token(kind, match.group().decode("ascii"), token_start, token_end)
+            start = end
+            if release is not None:
+                done = start - start % mmap.PAGESIZE
+                if done > released:
+                    buffer.madvise(release, released, done - released)
+                    released = done
+
+
+# Compact token store: parallel columns of kind, start and end offsets plus interned
+# identifier values. Token objects are only created on demand as read-only views.
+class TokenStream:
+    __slots__ = ("source", "kinds", "starts", "ends", "values")
+
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.values = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return self.token(index)
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self.token(index)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    # Materialize a Token view of the lexeme at the given index.
+    def token(self, index):
+        kind = self.kinds[index]
+        start, end = self.starts[index], self.ends[index]
+        if kind == K_IDENT:
+            return IdentToken("TT_IDENT", self.values[index], start, end)
+        if kind == K_EOF:
+            return Token("TT_EOF", None, start, end)
+        value = self.values[index]
+        if value is None:
+            value = self.source[start:end + 1]
+        return Token(TOKEN_KINDS[kind], value, start, end)
 
 
 # Define a Token class to represent different token types.
 class Token:
+    __slots__ = ("type", "value", "start", "end")
+
     def __init__(self, type_, value=None, start=None, end=None):
         self.type = type_
         self.value = value
@@ -83,7 +221,7 @@ class Token:
         return f'{self.type}'
 
     def read(self, obj):
-        if self.value:
+        if self.value is not None:
             if self.type == "TT_NUMBER":
                 self.value = float(self.value)
             return self.value
@@ -92,8 +230,11 @@ class Token:
 
 # Define a specialized IdentToken class for identifiers.
 class IdentToken(Token):
+    __slots__ = ("slot",)
+
     def __init__(self, type_, value=None, start=None, end=None):
         super().__init__(type_, value, start, end)
+        self.slot = None  # Storage slot, assigned by the Resolver
 
     def __repr__(self):
         if self.value:
@@ -101,12 +242,8 @@ class IdentToken(Token):
         return f'{self.type}'
 
     def read(self, obj):
-        try:
-            if obj.storage[self.value]:
-                return obj.storage[self.value]
-        except:
-            sys.exit(f"'{self.value}' doesn't exist")
-        return None
+        # The Resolver has already checked that the variable is assigned
+        return obj.slots[self.slot]
 
 # Function to check if a given token is a keyword.
 def isKeyWord(token):
@@ -1,59 +1,198 @@
 import tkinter as tk
 import tkinter.scrolledtext as scrolledtext
 import subprocess
+import threading
+import queue
+import json
+import os
+import sys
+from incremental import Document
 
-process = None  # Global variable to store the subprocess
+# Programs run in a persistent worker process (worker.py) that keeps the compiler stack
+# imported between runs. Its replies are read by a background thread and handed to the
+# Tk main loop through a queue, which poll_output() drains every POLL_INTERVAL ms, so the
+# window stays responsive and output appears while the program is still running.
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+POLL_INTERVAL = 50  # Milliseconds between checks for worker output
+
+worker = None  # The running worker process
+messages = queue.Queue()  # (worker, message) pairs from the reader threads
+run_id = 0  # Id of the latest run; output of older runs is ignored
+running = False
+document = Document()  # Incrementally analyzed contents of the editor
+pending_edits = []  # Edit requests for the worker's copy of the document, sent with the next run
+
+def start_worker():
+    # Start a worker and a daemon thread that forwards its replies to the queue, and give
+    # the worker the editor contents, which it parses while the user goes on editing
+    global worker
+    worker = subprocess.Popen(
+        [sys.executable, WORKER],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+    threading.Thread(target=read_worker, args=(worker,), daemon=True).start()
+    pending_edits.clear()
+    send({"mode": "open", "source": document.text()})
+
+def send(request):
+    worker.stdin.write(json.dumps(request) + "\n")
+    worker.stdin.flush()
+
+def read_worker(process):
+    for line in process.stdout:
+        messages.put((process, json.loads(line)))
+    messages.put((process, None))  # The worker exited
+
+def stop_worker():
+    if worker is not None and worker.poll() is None:
+        worker.kill()
+        worker.wait()
+
+def write_output(text, tag=None):
+    output_text.config(state=tk.NORMAL)
+    output_text.insert(tk.END, text, tag)
+    output_text.see(tk.END)
+    output_text.config(state=tk.DISABLED)
 
 def exec():
-    # Get the code from the text widget
-    code = text_widget.get("1.0", tk.END)
-    
+    # Bring the worker's document up to date and run it there
+    global run_id, running
+    if running:
+        cancel()
+    if worker is None or worker.poll() is not None:
+        start_worker()
+    run_id += 1
+    running = True
+    output_text.config(state=tk.NORMAL)
+    output_text.delete("1.0", tk.END)
+    output_text.config(state=tk.DISABLED)
     try:
-        global process
-
-        # Execute the code using subprocess
-        process = subprocess.Popen(
-            ["python", "compiler.py", code],  # Replace "compiler.py" with "-c" to work with Python compiler
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-
-        # Capture the stdout and stderr of the executed code
-        stdout, stderr = process.communicate(input=None)
-
-        # Update the output text widget
-        output_text.config(state=tk.NORMAL)
-        output_text.delete("1.0", tk.END)
-        output_text.insert(tk.END, stdout)
-        if stderr:
-            output_text.insert(tk.END, stderr, "error")
-        output_text.config(state=tk.DISABLED)
-    except Exception as e:
+        for request in pending_edits:
+            send(request)
+        pending_edits.clear()
+        send({"id": run_id, "mode": "run", "program": "editor"})
+    except OSError as e:
         # Handle exceptions and display error messages
-        output_text.config(state=tk.NORMAL)
-        output_text.delete("1.0", tk.END)
-        output_text.insert(tk.END, f"Error: {str(e)}")
-        output_text.config(state=tk.DISABLED)
+        running = False
+        write_output(f"Error: {str(e)}", "error")
+
+def cancel():
+    # A run is stopped by killing its worker; a fresh one is started right away so the
+    # next run does not wait for the imports
+    global running
+    if not running:
+        return
+    running = False
+    stop_worker()
+    start_worker()
+    write_output("\n[cancelled]\n", "error")
+
+def poll_output():
+    # Move everything the worker has sent so far into the output widget
+    global running
+    try:
+        while True:
+            process, message = messages.get_nowait()
+            if process is not worker:
+                continue  # A worker that was cancelled
+            if message is None:
+                if running:
+                    running = False
+                    write_output("\n[worker exited]\n", "error")
+            elif message.get("id") != run_id:
+                continue
+            elif "done" in message:
+                running = False
+            else:
+                write_output(message["text"], "error" if message["stream"] == "stderr" else None)
+    except queue.Empty:
+        pass
+    root.after(POLL_INTERVAL, poll_output)
+
+def editor_command(command, *args):
+    # Tcl command of the editor, in place of the widget's own (see below). Inserts, deletes
+    # and replaces are passed on, and the lines they changed are given to the document and,
+    # with the next run, to the worker
+    if command not in ("insert", "delete", "replace"):
+        return root.tk.call((text_command, command) + args)
+    # Old lines first..last, from the indices the command names; deleting a single
+    # character may join its line with the next
+    if command == "insert":
+        indices = args[:1]
+    elif command == "replace":
+        indices = args[:2]
+    else:
+        indices = args + (f"{args[-1]}+1c",) if len(args) % 2 else args
+    lines = line_count()
+    numbers = [min(line_number(index), lines) for index in indices]
+    first, last = min(numbers), max(numbers)
+    result = root.tk.call((text_command, command) + args)
+    new_last = last + line_count() - lines
+    texts = text_widget.get(f"{first}.0", f"{new_last}.end").split("\n")
+    pending_edits.append({"mode": "edit", "start": first - 1, "stop": last, "lines": texts})
+    show_problems(*document.edit(first - 1, last, texts))
+    return result
+
+def line_number(index):
+    return int(root.tk.call(text_command, "index", index).split(".")[0])
+
+def line_count():
+    return line_number("end-1c")
+
+def show_problems(first, last):
+    # Mark the lines first..last (last exclusive) that have a diagnostic; the marks of the
+    # other lines move with their text
+    text_widget.tag_remove("diagnostic", f"{first}.0", f"{last}.0")
+    for line, message in document.problems(first, last):
+        text_widget.tag_add("diagnostic", f"{line}.0", f"{line}.end")
+    problem = document.first_problem()
+    if problem is not None:
+        line, message = problem
+        more = f" (+{document.problem_count - 1} more)" if document.problem_count > 1 else ""
+        status.config(text=f"Line {line}: {message}{more}", foreground="red")
+    else:
+        status.config(text="No problems", foreground="black")
+
+def close():
+    stop_worker()
+    root.destroy()
 
 # Create the main Tkinter window
 root = tk.Tk()
 root.title("Python IDE")
+root.protocol("WM_DELETE_WINDOW", close)
 
 # Create a menu bar
 menu_bar = tk.Menu(root)
 root.config(menu=menu_bar)
 
-# Create a "Run" menu with an "Execute" command
+# Create a "Run" menu with "Execute" and "Cancel" commands
 run_menu = tk.Menu(menu_bar, tearoff=False)
 menu_bar.add_cascade(label="Run", menu=run_menu)
-run_menu.add_command(label="Execute", command=exec)
+run_menu.add_command(label="Execute", command=exec, accelerator="F5")
+run_menu.add_command(label="Cancel", command=cancel, accelerator="Esc")
+root.bind("<F5>", lambda event: exec())
+root.bind("<Escape>", lambda event: cancel())
 
 # Create a scrolled text widget for entering code
 text_widget = scrolledtext.ScrolledText(root, wrap=tk.WORD)
 text_widget.pack(expand=True, fill='both')
 text_widget.configure(font=("TkDefaultFont", 10))
+text_widget.tag_configure("diagnostic", underline=True, foreground="red")
+
+# Route the editor's Tcl command through editor_command, so every change reaches the
+# document as the range of lines it replaced (undo and redo go through it too)
+text_command = text_widget._w + "_text"
+root.tk.call("rename", text_widget._w, text_command)
+root.tk.createcommand(text_widget._w, editor_command)
+
+# Create a status line for the diagnostics of the code being edited
+status = tk.Label(root, anchor="w", text="No problems")
+status.pack(fill='x')
 
 # Create a scrolled text widget for displaying output
 output_text = scrolledtext.ScrolledText(root, wrap=tk.WORD)
@@ -61,5 +200,9 @@ output_text.pack(expand=True, fill='both')
 output_text.tag_configure("error", foreground="red")
 output_text.config(state=tk.DISABLED)
 
+# Start the worker now, so its imports are done before the first run
+start_worker()
+root.after(POLL_INTERVAL, poll_output)
+
 # Start the Tkinter event loop
-root.mainloop()
\ No newline at end of file
+root.mainloop()
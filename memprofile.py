@@ -0,0 +1,114 @@
+import fnmatch
+import os
+import re
+import sys
+import tracemalloc
+from collections import defaultdict
+from instrument import Stats
+from interpreter import UNSET
+from parser_1 import Assign
+
+# Memory profiling on top of tracemalloc. MemoryProfiler is a Stats, so compile_source
+# records each phase with it, and what a phase leaves allocated is the memory held by
+# its product (the token stream, the AST, the slot table, the compiled code). Execution
+# then runs one statement at a time to attribute allocation growth to source lines and
+# track how much the variable storage grows.
+
+# What each compiler phase produces, for the report
+PHASE_PRODUCTS = {
+    "validate": "diagnostics",
+    "lex": "tokens",
+    "parse": "AST",
+    "optimize": "AST rewrites",
+    "resolve": "storage slots",
+    "compile": "code",
+}
+
+# Allocations made by the profiling machinery itself (including the pattern caches that
+# filtering fills) and by the debugger's command loop are left out of snapshots. The
+# debugger imports this module, so its path is built rather than taken from the module
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, os.path.join(os.path.dirname(__file__), "debugger.py")),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, fnmatch.__file__),
+    tracemalloc.Filter(False, os.path.join(os.path.dirname(re.__file__), "*")),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def value_size(value):
+    # Bytes held by one variable's value (0 while unassigned)
+    return 0 if value is UNSET else sys.getsizeof(value)
+
+def storage_size(slots):
+    # Bytes held by the slot list and the values in it
+    return sys.getsizeof(slots) + sum(value_size(value) for value in slots)
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+def format_diff(snapshot, previous, limit=10):
+    # The source lines whose allocations changed most between two snapshots
+    rows = []
+    for stat in snapshot.compare_to(previous, "lineno")[:limit]:
+        if stat.size_diff:
+            frame = stat.traceback[0]
+            rows.append(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  "
+                        f"{frame.filename}:{frame.lineno}")
+    return "\n".join(rows) if rows else "  no change"
+
+class MemoryProfiler(Stats):
+
+    def __init__(self, frames=1):
+        # Tracing starts now and stays on, so phases measure what they keep allocated
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        super().__init__(trace_allocations=True)
+        self.memory_lines = defaultdict(lambda: [0, 0])  # line -> [traced growth, storage growth]
+        self.storage = None  # (variables, bytes) after execution
+
+    def execute(self, interpreter):
+        # Run the program statement by statement, measuring what each one leaves allocated
+        # and how it changes the size of the variable storage
+        code = interpreter.statement_code()
+        slots = interpreter.slots
+        for index, ast in enumerate(interpreter.asts):
+            slot = ast.slot if isinstance(ast, Assign) else None
+            old = value_size(slots[slot]) if slot is not None else 0
+            before = tracemalloc.get_traced_memory()[0]
+            interpreter.run_statements(code, index, index + 1)
+            entry = self.memory_lines[ast.line]
+            entry[0] += tracemalloc.get_traced_memory()[0] - before
+            if slot is not None:
+                entry[1] += value_size(slots[slot]) - old
+        self.storage = (len(interpreter.storage), storage_size(slots))
+
+    def to_json(self):
+        trace = super().to_json()
+        trace["memory_lines"] = {str(line): {"allocated": growth, "storage": storage}
+                                 for line, (growth, storage) in sorted(self.memory_lines.items())}
+        if self.storage is not None:
+            trace["storage"] = {"variables": self.storage[0], "bytes": self.storage[1]}
+        return trace
+
+    def summary(self, top_lines=10):
+        rows = ["Phase           product           retained (KiB)   peak (KiB)"]
+        for phase in self.phases:
+            product = PHASE_PRODUCTS.get(phase["name"], "")
+            rows.append(f"{phase['name']:<15} {product:<17} {phase['allocated'] / 1024:14.1f}   "
+                        f"{phase['peak'] / 1024:10.1f}")
+        if self.storage is not None:
+            rows.append("")
+            rows.append(f"Storage: {self.storage[0]} variables, {self.storage[1] / 1024:.1f} KiB")
+        if self.memory_lines:
+            rows.append("")
+            rows.append(f"Largest growth by line (top {top_lines})")
+            rows.append("Line         allocated (KiB)   storage (KiB)")
+            largest = sorted(self.memory_lines.items(), key=lambda item: -abs(item[1][0]))[:top_lines]
+            for line, (growth, storage) in largest:
+                rows.append(f"{line:<12} {growth / 1024:15.1f}   {storage / 1024:13.1f}")
+        current, peak = tracemalloc.get_traced_memory()
+        rows.append("")
+        rows.append(f"Traced now {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB")
+        return "\n".join(rows)
@@ -0,0 +1,171 @@
+import operator
+from lexer import Token
+from parser_1 import Node, BiNode, UnaryNode, Assign, postorder
+
+# Binary operators that can be evaluated at compile time
+FOLD_OPS = {
+    "TT_PLUS": operator.add,
+    "TT_MINUS": operator.sub,
+    "TT_MULT": operator.mul,
+    "TT_DIV": operator.truediv,
+    "TT_POW": operator.pow,
+}
+
+class Optimizer:
+    # AST optimization pass that runs between the Parser and the Interpreter.
+    # Level 1 folds BiNodes and negations with literal operands and simplifies identities
+    # such as x * 1, x - 0 and - -x; level 2 also removes dead stores. Every change is recorded
+    # in self.report as a (line, message) pair.
+
+    def __init__(self, level=1):
+        self.level = level
+        self.report = []
+
+    def optimize(self, asts):
+        if self.level >= 1:
+            for ast in asts:
+                ast.value = self.expression(ast.value, ast.line)
+        if self.level >= 2:
+            asts = self.eliminate_dead_stores(asts)
+        return asts
+
+    def iter_optimize(self, statements):
+        # Streaming variant: rewrite each statement's expression as it passes through.
+        # Dead-store elimination needs the whole program, so only level 1 applies here
+        for ast in statements:
+            if self.level >= 1:
+                ast.value = self.expression(ast.value, ast.line)
+            yield ast
+
+    def note(self, line, message):
+        self.report.append((line, message))
+
+    def format_report(self):
+        # Human-readable report, one change per line
+        if not self.report:
+            return "optimizer: nothing to do"
+        return "\n".join(f"line {line}: {message}" for line, message in self.report)
+
+    def expression(self, node, line):
+        # Rewrite an expression bottom-up, returning the (possibly new) node. results holds
+        # the rewritten operands; each operator is rewritten once its operands are
+        if isinstance(node, Node):
+            return node
+        results = []
+        for node in postorder(node):
+            if isinstance(node, Node):
+                results.append(node)
+            elif isinstance(node, BiNode):
+                node.right_node = results.pop()
+                node.left_node = results.pop()
+                results.append(self.binary(node, line))
+            elif isinstance(node, UnaryNode):
+                node.operand = results.pop()
+                results.append(self.negation(node, line))
+            else:
+                results.append(node)
+        return results[0]
+
+    def binary(self, node, line):
+        # Fold or simplify a BiNode whose operands are already rewritten
+        op = node.op_tok.type
+        left_value = literal(node.left_node)
+        right_value = literal(node.right_node)
+
+        if left_value is not None and right_value is not None:
+            try:
+                value = FOLD_OPS[op](left_value, right_value)
+            except ArithmeticError:
+                # Division by zero or overflow is left for the interpreter to report
+                return node
+            if not isinstance(value, float):
+                # e.g. a negative base with a fractional exponent gives a complex result
+                return node
+            start, end = span(node)
+            self.note(line, f"folded {brief(node)} -> {value}")
+            return Node(Token("TT_NUMBER", value, start, end))
+
+        # x + 0 is not rewritten: it turns -0.0 into 0.0, so dropping it would change output
+        simplified = None
+        if op == "TT_MINUS":
+            if right_value == 0:
+                simplified = node.left_node
+        elif op == "TT_DIV" or op == "TT_POW":
+            if right_value == 1:
+                simplified = node.left_node
+        elif op == "TT_MULT":
+            if right_value == 1:
+                simplified = node.left_node
+            elif left_value == 1:
+                simplified = node.right_node
+
+        if simplified is not None:
+            self.note(line, f"simplified {brief(node)} -> {brief(simplified)}")
+            return simplified
+        return node
+
+    def negation(self, node, line):
+        # Fold or simplify a UnaryNode whose operand is already rewritten
+        value = literal(node.operand)
+        if value is not None:
+            start, end = span(node)
+            self.note(line, f"folded {brief(node)} -> {-value}")
+            return Node(Token("TT_NUMBER", -value, start, end))
+        if isinstance(node.operand, UnaryNode):
+            simplified = node.operand.operand
+            self.note(line, f"simplified {brief(node)} -> {brief(simplified)}")
+            return simplified
+        return node
+
+    def eliminate_dead_stores(self, asts):
+        # Backward liveness over the straight-line program: an assignment is dead if
+        # its variable is overwritten before being read or is never read again
+        live = set()
+        kept = []
+        for ast in reversed(asts):
+            if isinstance(ast, Assign):
+                if ast.variable not in live:
+                    self.note(ast.line, f"removed dead store to {ast.variable}")
+                    continue
+                live.discard(ast.variable)
+            live.update(names_read(ast.value))
+            kept.append(ast)
+        kept.reverse()
+        # Report in source order
+        self.report.sort(key=lambda entry: entry[0] or 0)
+        return kept
+
+def brief(node):
+    # Short rendering for the report: only one operator level, deeper operands become "..."
+    # (repr of a whole large tree is slow)
+    if isinstance(node, BiNode):
+        left = "..." if isinstance(node.left_node, BiNode) else repr(node.left_node)
+        right = "..." if isinstance(node.right_node, BiNode) else repr(node.right_node)
+        return f"({left} {node.op_tok.value} {right})"
+    if isinstance(node, UnaryNode):
+        return f"(-{repr(node.operand) if isinstance(node.operand, Node) else '...'})"
+    return repr(node)
+
+def literal(node):
+    # Numeric value of a literal Node, or None for anything else
+    if isinstance(node, Node) and node.tok.type == "TT_NUMBER":
+        return float(node.tok.value)
+    return None
+
+def span(node):
+    # (start, end) source offsets covered by an expression: the start of its leftmost
+    # token and the end of its rightmost one
+    first = node
+    while isinstance(first, BiNode):
+        first = first.left_node
+    start = first.op_tok.start if isinstance(first, UnaryNode) else first.tok.start
+    last = node
+    while not isinstance(last, Node):
+        last = last.right_node if isinstance(last, BiNode) else last.operand
+    return start, last.tok.end
+
+def names_read(node):
+    # Yield every variable name an expression reads
+    for node in postorder(node):
+        if isinstance(node, Node) and node.tok.type == "TT_IDENT":
+            yield node.tok.value
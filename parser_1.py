@@ -1,58 +1,185 @@
+import operator
 import sys
+from collections import deque
+from lexer import (
+    TokenStream, KIND, K_EOF, K_NWL, K_NUMBER, K_IDENT, K_KEYW, K_PLUS, K_MINUS,
+    K_MULT, K_DIV, K_POW, K_EQ, K_LPAREN, K_RPAREN,
+)
+
+# Binary operator kind -> (precedence, right associative). Higher binds tighter; unary
+# minus sits between * / and **, as in Python: -a ** b is -(a ** b), a ** -b is a ** (-b)
+BINARY_OPERATORS = {
+    K_PLUS: (1, False),
+    K_MINUS: (1, False),
+    K_MULT: (2, False),
+    K_DIV: (2, False),
+    K_POW: (4, True),
+}
+UNARY_PRECEDENCE = 3
+OPEN_PAREN = (0, None, False)  # Operator-stack marker; its precedence stops every reduction
+
+# Binary operator token type -> function, the semantics of BiNode.read
+OPS = {
+    "TT_PLUS": operator.add,
+    "TT_MINUS": operator.sub,
+    "TT_MULT": operator.mul,
+    "TT_DIV": operator.truediv,
+    "TT_POW": operator.pow,
+}
+
+def reduce(operands, operators, precedence):
+    # Pop and apply the pending operators that bind tighter than precedence
+    while operators and operators[-1][0] > precedence:
+        _, tok, unary = operators.pop()
+        if unary:
+            operands[-1] = UnaryNode(tok, operands[-1])
+        else:
+            right = operands.pop()
+            operands[-1] = BiNode(operands[-1], tok, right)
+
+def parse_expression(kinds, token, position):
+    # Precedence climbing with explicit stacks instead of one recursive call per
+    # precedence level: operands collect finished subtrees, and operators holds pending
+    # unary/binary operators plus a marker for every open parenthesis, so nesting depth is
+    # only limited by memory. kinds are the token kinds, token(i) builds the token at i;
+    # returns the tree and the position of the first token after the expression.
+    # See BINARY_OPERATORS for precedence and associativity
+    operands = []
+    operators = []  # (precedence, token, is_unary), or OPEN_PAREN
+    depth = 0  # Open parentheses inside this expression
+    last = len(kinds) - 1  # The final token (TT_EOF) is never moved past
+    kind = kinds[position]
+    while True:
+        # Operand position: any number of prefix '-' and '(' before a number or name
+        while kind == K_MINUS or kind == K_LPAREN:
+            if kind == K_MINUS:
+                operators.append((UNARY_PRECEDENCE, token(position), True))
+            else:
+                operators.append(OPEN_PAREN)
+                depth += 1
+            if position < last:
+                position += 1
+                kind = kinds[position]
+        if kind == K_NUMBER or kind == K_IDENT:
+            operands.append(Node(token(position)))
+            if position < last:
+                position += 1
+                kind = kinds[position]
+        elif kind == K_EOF:
+            operands.append(Node(token(position)))
+        else:
+            sys.exit(f"Parsing Error: Expected a number, but got {token(position).value}")
+
+        # Operator position: close parentheses, then a binary operator or the end
+        while True:
+            if kind == K_RPAREN and depth:
+                reduce(operands, operators, 0)
+                operators.pop()  # The matching OPEN_PAREN
+                depth -= 1
+                if position < last:
+                    position += 1
+                    kind = kinds[position]
+                continue
+            operator = BINARY_OPERATORS.get(kind)
+            if operator is None:
+                if depth:
+                    sys.exit("Parsing Error: Expected a )")
+                reduce(operands, operators, 0)
+                return operands[0], position
+            precedence, right_associative = operator
+            # Pending operators that bind tighter (or as tight, for left associativity)
+            # take their operands first; reduce() inlined, this runs once per operator
+            limit = precedence if right_associative else precedence - 1
+            while operators and operators[-1][0] > limit:
+                _, tok, unary = operators.pop()
+                if unary:
+                    operands[-1] = UnaryNode(tok, operands[-1])
+                else:
+                    right = operands.pop()
+                    operands[-1] = BiNode(operands[-1], tok, right)
+            operators.append((precedence, token(position), False))
+            if position < last:
+                position += 1
+                kind = kinds[position]
+            break
 
 class Parser:
 
     def __init__(self, tokens):
-        # Constructor initializes the parser with a list of tokens
-        self.tokens = tokens
+        # Constructor initializes the parser with a compact TokenStream (read by index),
+        # a list of tokens or a lazy token generator
+        if isinstance(tokens, TokenStream):
+            self.stream = tokens
+            self.tokens = None
+        else:
+            self.stream = None
+            self.tokens = iter(tokens)
         self.currentPosition = -1
-        self.currentToken = None
-        self.advance()  # Call advance() to set the initial currentToken
+        self.kind = K_EOF  # Small-integer kind of the current token
+        self.line = 1  # Source line of the current token, counted from TT_NWL tokens
+        self._token = None
+        self.pending = deque()  # Streaming: tokens read ahead by expression(), not yet consumed
+        self.advance()  # Call advance() to set the initial current token
 
     def advance(self):
-        # Move to the next token in the list
-        self.currentPosition += 1
-        if self.currentPosition < len(self.tokens):
-            self.currentToken = self.tokens[self.currentPosition]
+        # Move to the next token; once the stream is exhausted the last token (TT_EOF) is kept
+        if self.stream is not None:
+            if self.currentPosition + 1 < len(self.stream.kinds):
+                self.currentPosition += 1
+                self.kind = self.stream.kinds[self.currentPosition]
+        else:
+            self.currentPosition += 1
+            self._token = self.pending.popleft() if self.pending else next(self.tokens, self._token)
+            self.kind = KIND[self._token.type]
+
+    @property
+    def currentToken(self):
+        # Token for the current position; on a TokenStream the view is only built when needed
+        if self.stream is not None:
+            return self.stream.token(self.currentPosition)
+        return self._token
 
     def runParse(self):
         # Main parsing function to parse statements
-        statements = []
+        return list(self.iter_statements())
 
-        while self.currentToken.type != "TT_EOF":
+    def iter_statements(self):
+        # Yield statements one at a time, each as soon as its terminating newline is reached
+        while self.kind != K_EOF:
 
-            if self.currentToken.type == "TT_NWL":
+            if self.kind == K_NWL:
+                self.line += 1
                 self.advance()
                 continue  # Skip newline tokens
 
+            line = self.line
             statement = self.isStatement()  # Check if it's a valid statement
-            if statement:
-                statements.append(statement)
-            else:
+            if not statement:
                 sys.exit("Add your statement function and change me")  # Exit if statement not recognized
 
-            if self.tokens[self.currentPosition].type != "TT_NWL":
+            if self.kind != K_NWL and self.kind != K_EOF:
                 sys.exit("Parsing Error: expected newline")  # Exit if newline expected but not found
 
-        return statements
+            statement.line = line
+            yield statement
 
     def isStatement(self):
         # Check and return specific types of statements (assignment or print)
-        if self.currentToken.type == "TT_IDENT":  # Assignment statement
+        if self.kind == K_IDENT:  # Assignment statement
             identifier = self.currentToken
             self.advance()
-            if self.currentToken.type == "TT_EQ":
+            if self.kind == K_EQ:
                 self.advance()
                 expression = self.expression()
                 return Assign(identifier, expression)
 
-        elif self.currentToken.type == "TT_KEYW" and self.currentToken.value == "print":  # Print statement
+        elif self.kind == K_KEYW and self.currentToken.value == "print":  # Print statement
             self.advance()
-            if self.currentToken.type == "TT_LPAREN":
+            if self.kind == K_LPAREN:
                 self.advance()
                 expression = self.expression()
 
-                if self.currentToken.type == "TT_RPAREN":
+                if self.kind == K_RPAREN:
                     self.advance()
                     return Print(expression)
                 else:
@@ -61,51 +188,25 @@ class Parser:
                 sys.exit("Parsing Error: expected '(' ")
 
     def expression(self):
-        # Parse expressions using BiOptn function with addition and subtraction operators
-        return self.BiOptn(self.term, ["TT_PLUS", "TT_MINUS"])
-
-    def term(self):
-        # Parse terms using BiOptn function with multiplication and division operators
-        return self.BiOptn(self.exponent, ["TT_MULT", "TT_DIV"])
-
-    def exponent(self):
-        # Parse exponentiation using BiOptn function with power operator
-        return self.BiOptn(self.factor, ["TT_POW"])
-
-    def factor(self):
-        # Parse factors (numbers, identifiers, parentheses)
-        tok = self.currentToken
-
-        if self.currentToken.type == "TT_NUMBER":
-            self.advance()
-            return Node(tok)
-        elif self.currentToken.type == "TT_IDENT":
-            self.advance()
-            return Node(tok)
-        elif self.currentToken.type == "TT_LPAREN":
-            self.advance()
-            expr = self.expression()
-            if self.currentToken.type == "TT_RPAREN":
-                self.advance()
-                return expr
-            else:
-                sys.exit("Parsing Error: Expected a )")
-        elif self.currentToken.type == "TT_EOF":
-            return Node(tok)
-        else:
-            sys.exit(f"Parsing Error: Expected a number, but got {self.currentToken.value}")
-
-    def BiOptn(self, func, opts):
-        # Parse binary operations with given function and operator options
-        left = func()
-
-        while self.currentToken.type in opts:
-            optn = self.currentToken
-            self.advance()
-            right = func()
-            left = BiNode(left, optn, right)
-
-        return left
+        # Parse one expression starting at the current token. The parsing itself works on
+        # an indexable run of kinds and a position (see parse_expression); a streaming
+        # parser first reads the rest of the line, since statements never span lines
+        if self.stream is not None:
+            tree, self.currentPosition = parse_expression(self.stream.kinds, self.stream.token,
+                                                          self.currentPosition)
+            self.kind = self.stream.kinds[self.currentPosition]
+            return tree
+        line = [self._token]
+        while self.kind != K_NWL and self.kind != K_EOF:
+            self._token = next(self.tokens, self._token)
+            self.kind = KIND[self._token.type]
+            line.append(self._token)
+        tree, position = parse_expression([KIND[tok.type] for tok in line], line.__getitem__, 0)
+        self.pending.extend(line[position + 1:])  # Tokens after the expression are read again
+        self._token = line[position]
+        self.kind = KIND[self._token.type]
+        self.currentPosition += position
+        return tree
 
 class Node:
     # Node class represents a basic node in the parse tree
@@ -128,7 +229,7 @@ class BiNode:
         self.right_node = right_node
 
     def __repr__(self):
-        return f'({self.left_node} {self.op_tok.value} {self.right_node})'
+        return render(self)
 
     def read(self, obj):
         # Perform the binary operation based on the operator type
@@ -143,29 +244,121 @@ class BiNode:
         if self.op_tok.type == "TT_POW":
             return self.left_node.read(obj) ** self.right_node.read(obj)
 
+class UnaryNode:
+    # UnaryNode class represents a prefix operation (negation) in the parse tree
+
+    def __init__(self, op_tok, operand):
+        self.op_tok = op_tok
+        self.operand = operand
+
+    def __repr__(self):
+        return render(self)
+
+    def read(self, obj):
+        return -self.operand.read(obj)
+
+# Expression trees are as deep as the longest operator chain or the deepest nesting in a
+# statement, which the parser does not limit, so the walks below use explicit stacks
+# instead of one Python call per level
+
+def postorder(node):
+    # List of the nodes of an expression tree, operands first, left to right: the reverse
+    # of a pre-order walk that visits right operands first
+    order = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if isinstance(node, BiNode):
+            stack.append(node.left_node)
+            stack.append(node.right_node)
+        elif isinstance(node, UnaryNode):
+            stack.append(node.operand)
+    order.reverse()
+    return order
+
+def read(node, obj):
+    # Value of an expression tree. The recursive read() methods are the fast path; a tree
+    # too deep for them is evaluated again with an explicit stack, which is safe because
+    # expressions have no side effects
+    try:
+        return node.read(obj)
+    except RecursionError:
+        return evaluate(node, obj)
+
+NEGATE = object()  # evaluate(): marks a pending UnaryNode
+RIGHT = object()  # evaluate(): marks a pending BiNode whose left operand is being evaluated
+
+def evaluate(node, obj):
+    # Value of an expression tree without recursion. pending holds (operator node, left
+    # operand value or marker) for the operators whose operands are being evaluated, i.e.
+    # the ancestors of node, outermost first (the profiler reads it to label samples)
+    pending = []
+    while True:
+        while True:
+            if isinstance(node, BiNode):
+                pending.append((node, RIGHT))
+                node = node.left_node
+            elif isinstance(node, UnaryNode):
+                pending.append((node, NEGATE))
+                node = node.operand
+            else:
+                break
+        value = node.read(obj)
+        while pending:
+            parent, left = pending[-1]
+            if left is RIGHT:
+                pending[-1] = (parent, value)
+                node = parent.right_node
+                break
+            pending.pop()
+            if left is NEGATE:
+                value = -value
+            else:
+                value = OPS[parent.op_tok.type](left, value)
+        else:
+            return value
+
+def render(node):
+    # Fully parenthesized source text of an expression tree
+    parts = []
+    for node in postorder(node):
+        if isinstance(node, BiNode):
+            right = parts.pop()
+            parts[-1] = f'({parts[-1]} {node.op_tok.value} {right})'
+        elif isinstance(node, UnaryNode):
+            parts[-1] = f'(-{parts[-1]})'
+        else:
+            parts.append(repr(node))
+    return parts[0]
+
 class Assign:
     # Assignment statement class
 
     def __init__(self, ident, value):
         self.variable = ident.value
         self.value = value
+        self.start = ident.start  # Source offset of the assigned variable
+        self.line = None  # Source line, set by the Parser
+        self.slot = None  # Storage slot, assigned by the Resolver
 
     def __repr__(self):
         return f"{self.variable} = {self.value}"
 
     def read(self, obj):
-        # Execute assignment by updating the variable in the object's storage
-        obj.storage[self.variable] = self.value.read(obj)
+        # Execute assignment by updating the variable's slot in the object's storage
+        obj.slots[self.slot] = read(self.value, obj)
 
 class Print:
     # Print statement class
 
     def __init__(self, value):
         self.value = value
+        self.line = None  # Source line, set by the Parser
 
     def __repr__(self):
         return f"print({self.value})"
 
     def read(self, obj):
-        # Execute print statement by printing the value
-        print(self.value.read(obj))
\ No newline at end of file
+        # Execute print statement by passing the value to the object's output function
+        obj.write(read(self.value, obj))
\ No newline at end of file
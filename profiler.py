@@ -0,0 +1,226 @@
+import bisect
+import signal
+import sys
+from collections import Counter
+from parser_1 import Node, BiNode, UnaryNode, Assign, Print, evaluate
+from bytecode import CodeGen, OPNAMES, MARK
+from pybackend import PROGRAM_FUNCTION, run_starts
+from interpreter import Interpreter
+from optimizer import span
+
+# Statistical sampling profiler for guest programs. A SIGPROF timer (setitimer) fires every
+# interval seconds of CPU time; its handler runs on the main thread, which executes the
+# Interpreter, and receives the frame that was interrupted, so samples land where the time
+# is spent (a sampling thread would only get the GIL when the interpreter releases it, i.e.
+# at print I/O). The handler maps the Python stack back to the guest statement and
+# expression being executed:
+#
+#   tree   - the Node/BiNode/UnaryNode/Assign/Print read() frames on the stack carry their
+#            nodes (for a tree too deep to recurse, the evaluate() frame's pending
+#            operators), and the nodes carry source offsets (Token.start/end)
+#   python - the generated function is located at guest source positions and calls a
+#            marker at the end of every run of statements without a print (signal handlers
+#            only run at calls), so the frame's current instruction gives the guest lines of
+#            the run the sample fell in
+#   vm     - the program is recompiled with a MARK instruction before every statement, and
+#            the run() frame's locals give the statement and the opcode being executed
+#
+# Samples are aggregated per source line and per guest stack, and written in the collapsed
+# stack format read by flamegraph.pl, speedscope and inferno. The tree walker runs
+# unchanged, and so does the Python backend's code, whose marker calls cost around 1%
+# (see pybackend.MARK_INTERVAL); their only other cost is the periodic stack walk. The VM
+# executes one MARK per statement, which adds some cost to arithmetic-heavy code. Needs
+# POSIX signals, and must be started on the main thread.
+
+DEFAULT_INTERVAL = 0.01
+MAX_EXPRESSION_FRAMES = 24  # Deeper tree-walker stacks keep only their innermost expressions
+MAX_LABEL = 120  # Characters per frame label
+
+# Code objects of the tree walker's evaluation methods
+READ_CODES = {cls.read.__code__ for cls in (Node, BiNode, UnaryNode, Assign, Print)}
+EVALUATE_CODE = evaluate.__code__
+
+class Profiler:
+
+    def __init__(self, interpreter, interval=DEFAULT_INTERVAL):
+        self.interpreter = interpreter
+        self.interval = interval
+        self.samples = Counter()  # guest stack (tuple of frame labels) -> samples
+        self.lines = Counter()  # source line -> samples
+        self.total = 0
+        self.previous_handler = None
+        self.sampling = False  # A sample is being taken; timer signals meanwhile are dropped
+        self.source_lines = None  # Split from the source when the first label needs it
+        self.python_code = None  # Python backend: the generated function, once sampled
+        self.run_code = Interpreter.run.__code__
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        # Profile the main thread, which is expected to execute the interpreter next
+        if not hasattr(signal, "setitimer"):
+            sys.exit("Profiling needs signal.setitimer, which this platform does not provide")
+        interpreter = self.interpreter
+        if interpreter.mode == "vm":
+            code = interpreter.compile()
+            if not code.marked:
+                interpreter.code = CodeGen(marked=True).compile(interpreter.asts, interpreter.names)
+        self.previous_handler = signal.signal(signal.SIGPROF, self.handler)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if self.previous_handler is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler)
+            self.previous_handler = None
+            if self.python_code is not None:
+                self.resolve_python()
+
+    def handler(self, signum, frame):
+        # Python runs signal handlers between bytecodes, so the timer can fire again inside
+        # a slow sample (e.g. one with a very deep guest stack). A tree walker that is about
+        # to fall back from a too deep recursion (see parser_1.read) leaves no room for the
+        # handler's own calls; that sample is dropped
+        if self.sampling:
+            return
+        self.sampling = True
+        try:
+            self.sample(frame)
+        except RecursionError:
+            pass
+        finally:
+            self.sampling = False
+
+    def sample(self, frame):
+        # Record one sample from the interrupted (innermost) Python frame
+        stack, line = self.guest_stack(frame)
+        del frame
+        if not stack:
+            return
+        self.total += 1
+        self.samples[stack] += 1
+        if line is not None:
+            self.lines[line] += 1
+
+    def guest_stack(self, frame):
+        # Return (labels from statement down to innermost expression, source line)
+        nodes = []
+        while frame is not None:
+            code = frame.f_code
+            if code in READ_CODES:
+                nodes.append(frame.f_locals["self"])
+            elif code is EVALUATE_CODE:
+                nodes.extend(node for node, _ in reversed(frame.f_locals.get("pending", ())))
+            elif code is self.run_code:
+                return self.vm_stack(frame.f_locals)
+            elif code.co_name == PROGRAM_FUNCTION:
+                return self.python_stack(frame)
+            frame = frame.f_back
+        if not nodes:
+            return (), None
+        nodes.reverse()
+        statement = nodes[0]
+        if not isinstance(statement, (Assign, Print)):
+            return (), None
+        labels = [self.statement_label(statement)]
+        expressions = nodes[1:]
+        if len(expressions) > MAX_EXPRESSION_FRAMES:
+            labels.append("...")
+            expressions = expressions[-MAX_EXPRESSION_FRAMES:]
+        labels.extend(self.expression_label(node) for node in expressions)
+        return tuple(labels), statement.line
+
+    def vm_stack(self, variables):
+        index = variables.get("statement")
+        if index is None:
+            return (), None
+        statement = self.interpreter.asts[index]
+        op = variables.get("op")
+        labels = (self.statement_label(statement),)
+        if op is not None and op != MARK:
+            labels += (OPNAMES[op],)
+        return labels, statement.line
+
+    def python_stack(self, frame):
+        # Only the offset of the instruction being executed is recorded while sampling; the
+        # frame's f_lineno would scan the line table on every sample, which on a large
+        # program takes longer than the sampling interval. See resolve_python
+        self.python_code = frame.f_code
+        return (frame.f_lasti,), None
+
+    def resolve_python(self):
+        # Replace the sampled instruction offsets by the runs of statements that end at the
+        # marker or print being executed, reading the line table and the runs once
+        samples = self.samples
+        offsets = sorted(stack[0] for stack in samples)
+        lines = {}
+        position = 0
+        for start, end, line in self.python_code.co_lines():
+            if position == len(offsets):
+                break
+            while position < len(offsets) and offsets[position] < end:
+                if offsets[position] >= start:
+                    lines[offsets[position]] = line
+                position += 1
+        starts = run_starts(self.python_code)
+        self.samples = Counter()
+        for (offset,), count in samples.items():
+            line = lines.get(offset)
+            position = bisect.bisect_right(starts, line or 0)
+            first = starts[position - 1] if position else line
+            if first == line:
+                label = self.line_label(line, None)
+            else:
+                label = f"lines {first}-{line}"
+                line = f"{first}-{line}"
+            self.samples[(label,)] += count
+            self.lines[line] += count
+
+    def statement_label(self, statement):
+        return self.line_label(statement.line, statement)
+
+    def line_label(self, line, statement):
+        if self.source_lines is None and self.interpreter.source:
+            self.source_lines = self.interpreter.source.splitlines()
+        if self.source_lines is not None and line and line <= len(self.source_lines):
+            return f"line {line}: {clean(self.source_lines[line - 1].strip())}"
+        if statement is not None:
+            return f"line {line}: {clean(repr(statement))}"
+        return f"line {line}"
+
+    def expression_label(self, node):
+        start, end = span(node)
+        if self.interpreter.source is not None and start is not None:
+            # Operand spans stop at the tokens, so restore parentheses they cut off
+            text = self.interpreter.source[start:end + 1]
+            depth = lowest = 0
+            for char in text:
+                if char == "(":
+                    depth += 1
+                elif char == ")":
+                    depth -= 1
+                    lowest = min(lowest, depth)
+            return clean("(" * -lowest + text + ")" * (depth - lowest))
+        return clean(repr(node))
+
+    def write_collapsed(self, file):
+        # One "frame;frame;frame count" line per distinct guest stack (flamegraph input)
+        for stack, count in sorted(self.samples.items()):
+            file.write(f"{';'.join(stack)} {count}\n")
+
+    def summary(self, top_lines=10):
+        rows = [f"{self.total} samples every {self.interval * 1000:g} ms",
+                "Line         samples        %"]
+        for line, count in self.lines.most_common(top_lines):
+            rows.append(f"{line:<12} {count:7d}   {count * 100 / max(self.total, 1):6.1f}")
+        return "\n".join(rows)
+
+def clean(text):
+    # Frame labels may not contain the collapsed-stack separators, and long ones are cut
+    text = " ".join(text.replace(";", ",").split())
+    return text if len(text) <= MAX_LABEL else text[:MAX_LABEL - 3] + "..."
@@ -0,0 +1,211 @@
+import ast
+import bisect
+import gc
+import keyword
+import re
+from parser_1 import Node, BiNode, UnaryNode, Assign, Print, postorder
+
+# Operator token type -> Python AST operator
+PY_OPS = {
+    "TT_PLUS": ast.Add,
+    "TT_MINUS": ast.Sub,
+    "TT_MULT": ast.Mult,
+    "TT_DIV": ast.Div,
+    "TT_POW": ast.Pow,
+}
+
+# Name of the generated function that holds the program body
+PROGRAM_FUNCTION = "__program__"
+
+# Deepest Python expression generated. CPython's compiler recurses once per level and
+# gives up a few thousand levels down, so deeper subexpressions are first assigned to
+# temporaries (__t0, __t1, ... which python_name never produces)
+SPILL_DEPTH = 100
+
+# Name of the no-op function the generated code calls to let the profiler in. CPython only
+# runs signal handlers at calls and backward jumps, which straight-line arithmetic has none
+# of, so the profiler's timer is handled at the next print or MARK_FUNCTION call. Bound to
+# int, a type, because calling a builtin function does not check for pending signals
+MARK_FUNCTION = "__mark__"
+
+# Expression nodes a run of statements may evaluate before it ends with a MARK_FUNCTION call.
+# A call after every statement would double the time of cheap ones; at this interval the
+# calls cost around 1% and a sample is only deferred by some tens of microseconds
+MARK_INTERVAL = 2000
+
+class PythonBackend:
+    # Translates resolved Assign/Print/BiNode/UnaryNode/Node trees into a Python ast.Module and
+    # compiles it with compile(). The statements become the body of one function that takes
+    # every variable as a parameter, in slot order, so variables are fast locals that start
+    # out with the Interpreter's current values; it returns them again at the end.
+    # Line and column information comes from the statement lines and Token.start/end.
+    # The statements are split into runs the code is not interrupted in: a run ends with a
+    # print, or with a call to MARK_FUNCTION located at its last statement once it has
+    # evaluated MARK_INTERVAL nodes, which lets the profiler sample it. The function's
+    # docstring lists the first line of every run (see run_starts).
+
+    def __init__(self, names, source=None, filename="<program>"):
+        self.names = names
+        self.filename = filename
+        # Offset of the first character of every source line, for offset -> column mapping
+        self.line_starts = None
+        if source is not None:
+            self.line_starts = [0] + [match.end() for match in re.finditer("\n", source)]
+        self.locals = [python_name(name, slot) for slot, name in enumerate(names)]
+        self.evaluated = 0  # Expression nodes translated for the current statement
+
+    def transpile(self, asts):
+        body = []
+        starts = []
+        run = 0  # Nodes evaluated since the current run started
+        for index, statement in enumerate(asts):
+            if not run:
+                starts.append(statement.line)
+            self.evaluated = 0
+            nodes = self.statement(statement)
+            body.extend(nodes)
+            run += self.evaluated
+            if isinstance(statement, Print):
+                run = 0
+            elif run >= MARK_INTERVAL or index == len(asts) - 1:
+                body.append(self.mark(nodes[-1]))
+                run = 0
+        docstring = self.locate(ast.Constant(" ".join(map(str, starts))), 1, 0, 0, 1)
+        body.insert(0, self.locate(ast.Expr(docstring), 1, 0, 0, 1))
+        # Synthetic nodes (the function and its return) are placed on line 1
+        result = [self.locate(ast.Name(name, ast.Load()), 1, 0, 0, 1) for name in self.locals]
+        body.append(self.locate(ast.Return(self.locate(ast.Tuple(result, ast.Load()), 1, 0, 0, 1)), 1, 0, 0, 1))
+        parameters = [self.locate(ast.arg(name), 1, 0, 0, 1) for name in self.locals]
+        function = ast.FunctionDef(
+            name=PROGRAM_FUNCTION,
+            args=ast.arguments(posonlyargs=[], args=parameters, kwonlyargs=[], kw_defaults=[], defaults=[]),
+            body=body,
+            decorator_list=[],
+        )
+        return ast.Module(body=[self.locate(function, 1, 0, 0, 1)], type_ignores=[])
+
+    def compile(self, asts):
+        # Building the Python AST allocates many small acyclic objects; pausing the cyclic
+        # garbage collector meanwhile keeps the cost linear in program size
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return compile(self.transpile(asts), self.filename, "exec")
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def statement(self, statement):
+        # Returns the list of Python statements: the temporaries the expression needs, then
+        # the statement itself
+        spilled = []
+        value = self.expression(statement.value, statement.line, spilled)
+        if isinstance(statement, Assign):
+            target = ast.Name(self.locals[statement.slot], ast.Store())
+            self.locate(target, statement.line, 0, len(statement.variable), statement.line)
+            node = ast.Assign(targets=[target], value=value)
+        elif isinstance(statement, Print):
+            function = self.locate(ast.Name("print", ast.Load()), statement.line, 0, 5, statement.line)
+            call = ast.Call(function, [value], [])
+            node = ast.Expr(call)
+            self.locate(call, statement.line, 0, value.end_col_offset + 1, value.end_lineno)
+        else:
+            raise TypeError(f"Cannot transpile statement {statement!r}")
+        spilled.append(self.locate(node, statement.line, 0, value.end_col_offset, value.end_lineno))
+        return spilled
+
+    def mark(self, node):
+        # MARK_FUNCTION() spanning the same source range as the statement node
+        position = (node.lineno, node.col_offset, node.end_col_offset, node.end_lineno)
+        function = self.locate(ast.Name(MARK_FUNCTION, ast.Load()), *position)
+        return self.locate(ast.Expr(self.locate(ast.Call(function, [], []), *position)), *position)
+
+    def expression(self, node, line, spilled):
+        # Post-order walk; results holds the translated operands and depths their nesting
+        # depth. A subexpression that reaches SPILL_DEPTH is assigned to a temporary in
+        # spilled, together with every operand to its left first, so evaluation order is kept
+        results = []
+        depths = []
+        order = postorder(node)
+        self.evaluated += len(order)
+        for node in order:
+            if isinstance(node, BiNode):
+                right = results.pop()
+                left = results.pop()
+                result = ast.BinOp(left, PY_OPS[node.op_tok.type](), right)
+                self.locate(result, left.lineno, left.col_offset, right.end_col_offset, right.end_lineno)
+                depth = max(depths.pop(), depths.pop()) + 1
+            elif isinstance(node, UnaryNode):
+                operand = results.pop()
+                result = self.locate_token(ast.UnaryOp(ast.USub(), operand), node.op_tok, line)
+                self.locate(result, result.lineno, result.col_offset, operand.end_col_offset, operand.end_lineno)
+                depth = depths.pop() + 1
+            elif isinstance(node, Node):
+                tok = node.tok
+                if tok.type == "TT_IDENT":
+                    result = ast.Name(self.locals[tok.slot], ast.Load())
+                else:
+                    result = ast.Constant(tok.read(None))
+                result = self.locate_token(result, tok, line)
+                depth = 1
+            else:
+                raise TypeError(f"Cannot transpile expression {node!r}")
+            results.append(result)
+            depths.append(depth)
+            if depth >= SPILL_DEPTH:
+                for index, operand in enumerate(results):
+                    if depths[index] > 1:
+                        results[index] = self.spill(operand, spilled)
+                        depths[index] = 1
+        return results[0]
+
+    def spill(self, value, spilled):
+        # Assign value to the next temporary and return a load of it at the same position
+        name = f"__t{len(spilled)}"
+        position = (value.lineno, value.col_offset, value.end_col_offset, value.end_lineno)
+        target = self.locate(ast.Name(name, ast.Store()), *position)
+        spilled.append(self.locate(ast.Assign(targets=[target], value=value), *position))
+        return self.locate(ast.Name(name, ast.Load()), *position)
+
+    def locate(self, node, line, col, end_col, end_line):
+        node.lineno = line or 1
+        node.end_lineno = end_line or node.lineno
+        node.col_offset = col
+        node.end_col_offset = end_col
+        return node
+
+    def locate_token(self, node, tok, line):
+        # Map the token's source offsets to (line, column); without the source only the
+        # statement line is known
+        if self.line_starts is None or tok.start is None:
+            return self.locate(node, line, 0, 0, line)
+        start_line = bisect.bisect_right(self.line_starts, tok.start)
+        end_line = bisect.bisect_right(self.line_starts, tok.end)
+        return self.locate(node, start_line, tok.start - self.line_starts[start_line - 1],
+                           tok.end + 1 - self.line_starts[end_line - 1], end_line)
+
+def python_name(name, slot):
+    # Local variable name for a program variable; Python keywords and reserved names are
+    # renamed so the generated code always compiles. The new names start with "__", like
+    # every renamed program name, and carry the slot, so they cannot collide with each
+    # other or with a name that is kept
+    if keyword.iskeyword(name) or name.startswith("__") or name == "print":
+        return f"__v{slot}_{name}"
+    return name
+
+def run_starts(code):
+    # First source line of every run of statements in a generated PROGRAM_FUNCTION code
+    # object (see PythonBackend), read from its docstring
+    return [int(line) for line in code.co_consts[0].split()]
+
+def compile_python(asts, names, source=None, filename="<program>"):
+    # Convenience wrapper: resolved statement trees -> Python code object
+    return PythonBackend(names, source, filename).compile(asts)
+
+def run_python(code, slots, write=print):
+    # Execute a code object produced by compile_python with the given initial slot values and
+    # output function; returns the final variable values in slot order
+    namespace = {"__name__": "__program__", "print": write, MARK_FUNCTION: int}
+    exec(code, namespace)
+    function = namespace[PROGRAM_FUNCTION]
+    return function(*slots[:function.__code__.co_argcount])
@@ -0,0 +1,47 @@
+import sys
+from parser_1 import Node, BiNode, UnaryNode, Assign
+
+class Resolver:
+    # Name-resolution pass: gives every variable a fixed slot index before execution.
+    # Assign statements get a .slot and identifier tokens get a .slot, so the
+    # Interpreter reads and writes a preallocated list instead of a dict. Because
+    # programs are straight-line, a read before the first assignment is reported here.
+
+    def __init__(self, names=()):
+        # names: variables that already hold a value before the program runs
+        self.names = list(names)
+        self.index = {name: slot for slot, name in enumerate(self.names)}
+        self.defined = set(self.names)
+
+    def resolve(self, asts):
+        # Annotate the trees in place and return the slot -> name table
+        for ast in asts:
+            self.expression(ast.value, ast.line)
+            if isinstance(ast, Assign):
+                ast.slot = self.slot(ast.variable)
+                self.defined.add(ast.variable)
+        return self.names
+
+    def slot(self, name):
+        index = self.index.get(name)
+        if index is None:
+            index = self.index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def expression(self, node, line):
+        # Visit the names left to right; the explicit stack holds the operands still to
+        # visit, right ones below left ones, so deep trees do not recurse
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, BiNode):
+                stack.append(node.right_node)
+                stack.append(node.left_node)
+            elif isinstance(node, UnaryNode):
+                stack.append(node.operand)
+            elif isinstance(node, Node) and node.tok.type == "TT_IDENT":
+                name = node.tok.value
+                if name not in self.defined:
+                    sys.exit(f"Name Error: '{name}' doesn't exist (line {line})")
+                node.tok.slot = self.slot(name)
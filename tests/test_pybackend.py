@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import compiler
+
+def run(source, backend):
+    # Printed values of source compiled for backend
+    args = compiler.parse_args(["", "--no-cache", "--backend", backend])
+    interpreter = compiler.compile_source(source, args)
+    output = []
+    interpreter.write = output.append
+    interpreter.execute()
+    return output
+
+@pytest.mark.parametrize("backend", ["vm", "tree", "python"])
+def test_renamed_variable_does_not_collide_with_program_variable(backend):
+    # __x is renamed for the Python backend; the new name must not be one the program uses
+    source = "__x = 2\n_v0___x = 5\nprint(__x)\nprint(_v0___x)\n"
+    assert run(source, backend) == [2.0, 5.0]
@@ -1,44 +1,269 @@
 import ast
-import black
-import flake8.api
-import pylint.lint
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from cache import DEFAULT_CACHE_DIR
 
-# Database to track previously identified errors
-previous_errors = {}
+# File in the cache directory where checker results and previously seen syntax errors are
+# persisted between runs
+STORE_NAME = "diagnostics.json"
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_PROGRAMS = 64  # Programs whose last syntax errors are remembered
 
-def parse_code(code):
+# Checkers are top-level functions so they can run in a process pool. Each takes the
+# code and returns a list of diagnostics: {"line": int or None, "message": str}.
+
+def check_syntax(code):
     try:
-        parsed = ast.parse(code)
-        print("Code is syntactically correct!")
-
-        # Check if previously identified errors have been resolved
-        for error_line, error_description in previous_errors.items():
-            if error_line not in [node.lineno for node in ast.walk(parsed)]:
-                print(f"Previously identified error at line {error_line} ({error_description}) has been resolved.")
-
-        # Perform code formatting check using black
-        formatted_code = black.format_file_contents(code, fast=True)
-        if code != formatted_code:
-            print("Code does not comply with formatting standards.")
-            # Consider storing this as an error or warning as needed
-
-        # Lint the code using flake8
-        style_guide = flake8.api.StyleGuide()
-        report = style_guide.check_files([__file__])  # Pass the file name or use a temporary file
-        if report.total_errors > 0:
-            print(f"Found {report.total_errors} style issues.")
-
-        # Analyze code using pylint
-        pylint_output = pylint.lint.Run(["--disable=all", "--enable=F,E,unreachable", "-r", "n", "your_file.py"], exit=False)
-        if pylint_output.linter.stats['error'] > 0:
-            print(f"Pylint found {pylint_output.linter.stats['error']} errors.")
-
-        return True
+        ast.parse(code)
     except SyntaxError as e:
-        print(f"Syntax Error: {e.msg} at line {e.lineno}, column {e.offset}:")
-        print(e.text)
-        print(" " * (e.offset - 1) + "^")
+        return [{"line": e.lineno, "message": e.msg, "offset": e.offset, "text": e.text}]
+    except (RecursionError, MemoryError, ValueError) as e:
+        # Python's own parser gives up on very deeply nested or huge input, and rejects
+        # some bytes (NUL) outright; report it as a syntax error without a position
+        message = "program too deeply nested or too large" if not isinstance(e, ValueError) else str(e)
+        return [{"line": None, "message": message, "offset": None, "text": None}]
+    return []
+
+def check_black(code):
+    import black
+    if black.format_str(code, mode=black.Mode()) != code:
+        return [{"line": None, "message": "Code does not comply with formatting standards."}]
+    return []
+
+def check_flake8(code):
+    from flake8.api import legacy
+    with _temporary_source(code) as path:
+        report = legacy.get_style_guide().check_files([path])
+    if report.total_errors > 0:
+        return [{"line": None, "message": f"Found {report.total_errors} style issues."}]
+    return []
+
+def check_pylint(code):
+    import pylint.lint
+    from pylint.reporters.text import TextReporter
+    with _temporary_source(code) as path:
+        result = pylint.lint.Run(["--disable=all", "--enable=F,E,unreachable", "-r", "n", path],
+                                 reporter=TextReporter(io.StringIO()), exit=False)
+    stats = result.linter.stats
+    errors = stats["error"] if isinstance(stats, dict) else stats.error
+    if errors > 0:
+        return [{"line": None, "message": f"Pylint found {errors} errors."}]
+    return []
+
+@contextmanager
+def _temporary_source(code):
+    # Write code to a temporary .py file for the file-based linters
+    fd, path = tempfile.mkstemp(suffix=".py")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(code)
+        yield path
+    finally:
+        os.remove(path)
+
+CHECKERS = {
+    "syntax": check_syntax,
+    "black": check_black,
+    "flake8": check_flake8,
+    "pylint": check_pylint,
+}
+
+# Validation tiers: "syntax" is cheap enough for the run path, "full" adds the linters
+TIERS = {
+    "syntax": ["syntax"],
+    "full": ["syntax", "black", "flake8", "pylint"],
+}
+
+class DiagnosticsStore:
+    # Bounded, persisted store of checker results keyed by (checker, content hash), plus the
+    # syntax errors seen on the last failed run of each named program (previous_errors maps
+    # program -> {line: message}). It replaces the old unbounded module-level
+    # previous_errors dict; the least recently used results are dropped beyond max_entries.
+    # Without a path nothing is persisted and the store lasts as long as the process.
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.previous_errors = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        try:
+            results = OrderedDict((tuple(key.split(":", 1)), value) for key, value in data.get("results", []))
+            previous_errors = {
+                program: {int(line): message for line, message in errors.items()}
+                for program, errors in data.get("previous_errors", {}).items()
+            }
+        except (AttributeError, TypeError, ValueError):
+            return  # Malformed or older format: start empty rather than fail every run
+        self.results = results
+        self.previous_errors = previous_errors
+
+    def save(self):
+        # Atomic rewrite so concurrent compiler runs never read a half-written file
+        if self.path is None or not self.dirty:
+            return
+        self.dirty = False
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            "results": [[":".join(key), value] for key, value in self.results.items()],
+            "previous_errors": self.previous_errors,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, checker, digest):
+        key = (checker, digest)
+        if key not in self.results:
+            return None
+        self.results.move_to_end(key)
+        return self.results[key]
+
+    def put(self, checker, digest, diagnostics):
+        key = (checker, digest)
+        self.results[key] = diagnostics
+        self.results.move_to_end(key)
+        self.dirty = True
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+
+class Validator:
+    # Tiered validation engine. Results of every checker are cached by content hash in a
+    # DiagnosticsStore; checkers that still have to run are executed concurrently in a
+    # process pool, except the syntax check, which is fast and always runs inline.
+
+    def __init__(self, store=None, max_workers=None):
+        self.store = store if store is not None else DiagnosticsStore()
+        self.max_workers = max_workers
+        self.pool = None
+
+    def digest(self, code):
+        return hashlib.sha256(code.encode()).hexdigest()
+
+    def run(self, code, tier="syntax"):
+        # Run every checker of the tier and return {checker: diagnostics}
+        return self.collect(self.submit(code, tier))
+
+    def submit(self, code, tier="full"):
+        # Start the checkers of a tier without waiting for the pooled ones; pass the result
+        # to collect() later. This is how full lint runs in the background.
+        digest = self.digest(code)
+        pending = {}
+        for checker in TIERS[tier]:
+            cached = self.store.get(checker, digest)
+            if cached is not None:
+                pending[checker] = cached
+            elif checker == "syntax":
+                pending[checker] = self._record(checker, digest, check_syntax(code))
+            else:
+                if self.pool is None:
+                    # Only the lint tiers need the pool; the syntax tier on the run path
+                    # does not import multiprocessing at all
+                    from concurrent.futures import ProcessPoolExecutor
+                    self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                pending[checker] = self.pool.submit(CHECKERS[checker], code)
+        return digest, pending
+
+    def collect(self, submitted):
+        digest, pending = submitted
+        results = {}
+        for checker, value in pending.items():
+            if not isinstance(value, list):
+                try:
+                    value = self._record(checker, digest, value.result())
+                except Exception as e:
+                    # Linter missing or crashed on this input: report it without caching
+                    value = [{"line": None, "message": f"{checker} failed: {e}"}]
+            results[checker] = value
+        self.store.save()
+        return results
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def _record(self, checker, digest, diagnostics):
+        self.store.put(checker, digest, diagnostics)
+        return diagnostics
+
+_default_validators = {}  # Cache directory -> the process's Validator storing results there
+
+def default_validator(cache_dir=DEFAULT_CACHE_DIR):
+    # Shared validator whose store is persisted in cache_dir, the directory of the compilation
+    # cache; None (--no-cache) keeps results in memory only
+    validator = _default_validators.get(cache_dir)
+    if validator is None:
+        path = None if cache_dir is None else os.path.join(cache_dir, STORE_NAME)
+        validator = _default_validators[cache_dir] = Validator(DiagnosticsStore(path))
+    return validator
+
+def report(results):
+    # Print non-syntax diagnostics the way the original validator did
+    for checker, diagnostics in results.items():
+        if checker == "syntax":
+            continue
+        for diagnostic in diagnostics:
+            print(diagnostic["message"])
+
+def parse_code(code, tier="syntax", validator=None, program=None):
+    # Validate code at the given tier; returns False if it has a syntax error. program names
+    # the program (e.g. its file) so that a later run of the same program can report its
+    # errors as resolved; anonymous programs are not remembered
+    validator = validator or default_validator()
+    results = validator.run(code, tier)
+    store = validator.store
+    syntax_errors = results["syntax"]
+
+    if syntax_errors:
+        e = syntax_errors[0]
+        if e["line"] is None:
+            print(f"Syntax Error: {e['message']}")
+            return False
+        print(f"Syntax Error: {e['message']} at line {e['line']}, column {e['offset']}:")
+        print(e["text"])
+        print(" " * ((e["offset"] or 1) - 1) + "^")
+
+        # Remember the current error so a later run can report it as resolved
+        if program is not None:
+            errors = store.previous_errors.pop(program, {})
+            errors[e["line"]] = e["message"]
+            store.previous_errors[program] = errors  # Most recent last
+            while len(store.previous_errors) > DEFAULT_MAX_PROGRAMS:
+                del store.previous_errors[next(iter(store.previous_errors))]
+            store.dirty = True
+            store.save()
+        return False
+
+    print("Code is syntactically correct!")
+
+    # Check if previously identified errors of this program have been resolved
+    if program in store.previous_errors:
+        for error_line, error_description in sorted(store.previous_errors.pop(program).items()):
+            print(f"Previously identified error at line {error_line} ({error_description}) has been resolved.")
+        store.dirty = True
+        store.save()
 
-        # Store the current error in the database
-        previous_errors[e.lineno] = e.msg
-        return False
\ No newline at end of file
+    report(results)
+    return True
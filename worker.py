@@ -0,0 +1,213 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+# Persistent execution worker for the IDE and the compile daemon. The compiler stack is
+# imported once, then programs arrive one per line on stdin as JSON requests:
+#
+#   {"id": 3, "source": "a = 1\nprint(a)\n", "mode": "run", "memory": 67108864}
+#
+# mode is tokenize, parse or run (the default); memory optionally caps how many bytes the
+# worker may grow by during the request, and an optional "program" name lets a run report
+# the syntax errors of that program's previous run as resolved. The replies stream back on stdout, one JSON
+# message per line:
+#
+#   {"id": 3, "stream": "stdout", "text": "1\n"}   output, sent as it is produced
+#   {"id": 3, "done": "ok", "timings": {...}}     end of the request: ok, invalid, error
+#                                                 or memory limit, plus "result" (the
+#                                                 tokens or statements) for tokenize/parse
+#
+# The IDE also keeps a copy of its editor in the worker as an incremental.Document, so
+# runs start from statements that are already parsed:
+#
+#   {"mode": "open", "source": "a = 1\n"}                     replace the document
+#   {"mode": "edit", "start": 0, "stop": 1, "lines": ["a = 2"]}  replace lines start..stop
+#   {"id": 4, "mode": "run", "program": "editor"}                 run without a "source"
+#
+# A run is cancelled by terminating the worker; the IDE then starts a fresh one.
+
+FLUSH_INTERVAL = 0.05  # Seconds between output messages while a program is running
+
+class Channel:
+    # Protocol side of the worker: writes one JSON message per line to the real stdout. The
+    # lock keeps messages from the flusher thread (see flushing) whole
+    def __init__(self, file):
+        self.file = file
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(message) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+class OutputStream:
+    # File-like stand-in for sys.stdout/sys.stderr during a run. Text is collected and sent
+    # every FLUSH_INTERVAL by the request's flusher thread, so a program that prints in a
+    # tight loop does not pay for one message per value, while output still appears as it
+    # is produced, also when a print is followed by a long computation.
+    def __init__(self, channel, request_id, name):
+        self.channel = channel
+        self.request_id = request_id
+        self.name = name
+        self.parts = []
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.parts.append(text)
+        return len(text)
+
+    def flush(self):
+        # Sending under the lock keeps the flusher and the final flush of a run in order
+        with self.lock:
+            if self.parts:
+                text = "".join(self.parts)
+                self.parts = []
+                self.channel.send({"id": self.request_id, "stream": self.name, "text": text})
+
+@contextlib.contextmanager
+def flushing(streams):
+    # Flush the streams every FLUSH_INTERVAL from a background thread while the block runs.
+    # It gets the GIL at the interpreter's periodic switches, which the tree walker and the
+    # VM reach at every statement and the Python backend at its marker calls
+    done = threading.Event()
+
+    def flush():
+        while not done.wait(FLUSH_INTERVAL):
+            for stream in streams:
+                stream.flush()
+
+    thread = threading.Thread(target=flush, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+def address_space():
+    # Current virtual memory size of this process in bytes, None where it cannot be read
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+@contextlib.contextmanager
+def memory_limit(limit):
+    # Let the process grow by at most limit bytes while the block runs; a run that needs
+    # more gets a MemoryError. Needs the POSIX resource module and a readable current size
+    size = address_space() if limit else None
+    if size is None:
+        yield
+        return
+    import resource
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    cap = size + limit
+    if hard != resource.RLIM_INFINITY:
+        cap = min(cap, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (cap, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+def tokenize(request, args, timings):
+    from lexer import Lexer
+    start = time.perf_counter()
+    tokens = [[tok.type, tok.value, tok.start, tok.end] for tok in Lexer(request["source"]).getTokenStream()]
+    timings["lex"] = time.perf_counter() - start
+    return tokens
+
+def parse(request, args, timings):
+    from lexer import Lexer
+    from parser_1 import Parser
+    start = time.perf_counter()
+    asts = Parser(Lexer(request["source"]).getTokenStream()).runParse()
+    timings["parse"] = time.perf_counter() - start
+    return [{"line": ast.line, "statement": repr(ast)} for ast in asts]
+
+def run(request, args, timings):
+    # Run the request's source, or the document from its statements. A document with a
+    # lexing or parsing error is compiled from its text, which reports the error
+    import compiler
+    source, statements = request.get("source"), None
+    if source is None:
+        source = document.text()
+        if not document.errors:
+            statements = document.statements()
+    if compiler.run_program(source, args, program=request.get("program"), timings=timings,
+                            statements=statements) is None:
+        return "invalid"
+    return None
+
+document = None  # The IDE's incremental.Document
+
+def open_document(request, args, timings):
+    global document
+    from incremental import Document
+    start = time.perf_counter()
+    document = Document(request["source"])
+    timings["parse"] = time.perf_counter() - start
+
+def edit_document(request, args, timings):
+    start = time.perf_counter()
+    document.edit(request["start"], request["stop"], request["lines"])
+    timings["parse"] = time.perf_counter() - start
+
+# Request mode -> handler(request, args, timings); the result is sent back with the reply
+MODES = {"tokenize": tokenize, "parse": parse, "run": run, "open": open_document, "edit": edit_document}
+
+def run_request(request, args, channel):
+    # Handle one request with its output streamed back; never raises, so a failing program
+    # (including the sys.exit calls in the Lexer and Parser) leaves the worker running
+    request_id = request.get("id")
+    stdout = OutputStream(channel, request_id, "stdout")
+    stderr = OutputStream(channel, request_id, "stderr")
+    status, result, timings = "ok", None, {}
+    handler = MODES.get(request.get("mode", "run"))
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        with flushing((stdout, stderr)):
+            if handler is None:
+                sys.exit(f"Unknown mode: {request.get('mode')}")
+            with memory_limit(request.get("memory")):
+                result = handler(request, args, timings)
+            if result == "invalid":
+                status, result = "invalid", None
+    except SystemExit as e:
+        status = "error"
+        if e.code is not None:
+            print(e.code, file=stderr)
+    except MemoryError:
+        status = "memory limit"
+    except Exception:
+        status = "error"
+        traceback.print_exc(file=stderr)
+    finally:
+        sys.stdout, sys.stderr = saved
+    stdout.flush()
+    stderr.flush()
+    reply = {"id": request_id, "done": status, "timings": timings}
+    if result is not None:
+        reply["result"] = result
+    channel.send(reply)
+
+def serve(argv=None):
+    # Worker main loop; argv are compiler.py options applied to every run
+    import compiler
+    args = compiler.parse_args(["", *(sys.argv[1:] if argv is None else argv)])
+    channel = Channel(sys.stdout)
+    channel.send({"ready": True})
+    for line in sys.stdin:
+        if line.strip():
+            run_request(json.loads(line), args, channel)
+
+if __name__ == "__main__":
+    serve()